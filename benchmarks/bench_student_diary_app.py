@@ -0,0 +1,362 @@
+"""학생 일기 앱 페이지별 비용 측정.
+
+Streamlit AppTest로 student_diary_app_FINAL_cleaned.py를 실행하고, gspread는 fake_gspread로 바꿔서
+로그인 -> check_notes -> write_emotion -> write_gratitude -> write_message -> confirm_submission -> view_diary_only
+흐름의 페이지마다 API 호출 수, 전송 바이트, 걸린 시간을 잰다.
+변경 확인 시나리오는 공유 캐시 TTL을 짧게 바꿔서, 만료 뒤 시트가 그대로일 때와 선생님이 쪽지를 고쳤을 때의 호출을 잰다.
+
+    python benchmarks/bench_student_diary_app.py --rows 10 365 2000 --concurrent 10 --latency-ms 50
+
+결과는 --output(기본 benchmarks/bench_results.json)에 JSON으로 저장해서 회귀 여부를 비교할 수 있다.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import gspread
+import streamlit as st
+import streamlit.testing.v1.app_test as app_test_module
+from oauth2client.service_account import ServiceAccountCredentials
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_gspread import FakeClient, FakeSheetsService  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "student_diary_app_FINAL_cleaned.py")
+ROSTER_TITLE = "학생목록"
+HEADER = ["날짜", "감정", "감사한 일", "하고 싶은 말", "선생님 쪽지"]
+QUEUE_IDLE_SECONDS = 1.5 # 백그라운드 저장이 이만큼 조용하면 끝난 것으로 본다
+QUEUE_DRAIN_TIMEOUT_SECONDS = 120
+CHANGE_DETECTION_TTL_SECONDS = 1 # 변경 확인 시나리오에서 쓰는 공유 일기 캐시 TTL
+
+
+def make_diary_rows(n_rows):
+    # 어제부터 거슬러 올라가는 n_rows개의 일기 (오늘 제출은 새 행 추가가 되도록), 7일마다 선생님 쪽지
+    today = date.today()
+    rows = [["설정", "2000-01-01"], list(HEADER)]
+    for i in range(n_rows, 0, -1):
+        day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+        rows.append([day, "😀 긍정 - 기쁨", f"감사한 일 {i} " * 3, f"하고 싶은 말 {i} " * 5, "잘했어요!" if i % 7 == 0 else ""])
+    return rows
+
+
+def student_sheet_url(k):
+    return f"https://docs.google.com/spreadsheets/d/student{k}"
+
+
+def build_fake_backend(n_students, n_rows, service):
+    client = FakeClient(service)
+    roster = [["이름", "비밀번호", "시트URL"]]
+    for k in range(n_students):
+        url = student_sheet_url(k)
+        roster.append([f"학생{k}", f"{100000 + k}", url])
+        client.add_sheet(url=url, rows=make_diary_rows(n_rows))
+    client.add_sheet(title=ROSTER_TITLE, rows=roster)
+    return client
+
+
+class AppWorkspace:
+    """앱을 임시 폴더에 복사해서 실행 (저장 대기열 저널 등 부산물이 저장소에 남지 않도록).
+    overrides로 앱의 설정 상수(예: {"DIARY_CACHE_TTL_SECONDS": 1})를 바꿔서 복사할 수 있다."""
+    def __init__(self, overrides=None):
+        self.dir = tempfile.mkdtemp(prefix="diary_bench_")
+        self.app_path = os.path.join(self.dir, os.path.basename(APP_PATH))
+        with open(APP_PATH, encoding="utf-8") as f:
+            source = f.read()
+        for name, value in (overrides or {}).items():
+            source, n = re.subn(rf"^{name} = .*$", f"{name} = {value!r}", source, count=1, flags=re.M)
+            if not n:
+                raise KeyError(f"앱에 설정 상수 {name}이(가) 없습니다")
+        with open(self.app_path, "w", encoding="utf-8") as f:
+            f.write(source)
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def install_fake(client):
+    gspread.authorize = lambda credentials, *a, **k: client
+    ServiceAccountCredentials.from_json_keyfile_dict = classmethod(lambda cls, keyfile_dict, scopes=None: object())
+    # 시나리오마다 프로세스 공유 캐시(클라이언트, 핸들 풀, 학생목록 등)를 비운다
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+class _SharedRuntimeMeta(type):
+    def __setattr__(cls, name, value):
+        if name == "_instance":
+            # 첫 실행의 가짜 Runtime을 시나리오 내내 유지하고, 실행이 끝날 때의 None 대입은 무시
+            if value is not None and Runtime._instance is None:
+                Runtime._instance = value
+            return
+        super().__setattr__(name, value)
+
+
+class _SharedRuntime(Runtime, metaclass=_SharedRuntimeMeta):
+    pass
+
+
+@contextlib.contextmanager
+def shared_apptest_runtime():
+    """AppTest는 실행마다 전역 Runtime._instance를 설정했다가 지우므로 여러 스레드에서 동시에 돌릴 수 없다.
+    시나리오 동안 하나의 가짜 Runtime을 공유해서 여러 학생 세션을 동시에 실행한다."""
+    app_test_module.Runtime = _SharedRuntime
+    # CPython 3.11 초기 버전은 여러 스레드가 동시에 파싱/컴파일하면 SystemError가 날 수 있어 스크립트 컴파일을 직렬화
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def serialized_get_bytecode(self, *args, **kwargs):
+        with compile_lock:
+            return get_bytecode(self, *args, **kwargs)
+    ScriptCache.get_bytecode = serialized_get_bytecode
+    try:
+        yield
+    finally:
+        ScriptCache.get_bytecode = get_bytecode
+        app_test_module.Runtime = Runtime
+        Runtime._instance = None
+
+
+def _click(at, key):
+    for button in at.button:
+        if button.key == key:
+            button.click()
+            at.run()
+            return
+    raise RuntimeError(f"버튼 '{key}'이(가) 없습니다. 현재 페이지: {at.session_state['student_page']}")
+
+
+def _errors(at):
+    return [e.value for e in at.error] + [str(e.value) for e in at.exception]
+
+
+def wait_for_queue_idle(service):
+    # 제출은 백그라운드에서 시트에 저장되므로 호출이 멈출 때까지 기다린다
+    last, quiet_since, started = service.snapshot(), time.monotonic(), time.monotonic()
+    while time.monotonic() - started < QUEUE_DRAIN_TIMEOUT_SECONDS:
+        time.sleep(0.1)
+        now = service.snapshot()
+        if now != last:
+            last, quiet_since = now, time.monotonic()
+        elif time.monotonic() - quiet_since >= QUEUE_IDLE_SECONDS:
+            return
+
+
+def run_student_flow(app_path, name, password, service=None, timeout=120, sheet_key=None):
+    """한 학생의 전체 흐름을 실행하고 단계별 (페이지, 걸린 시간, 호출 전/후 기록) 목록을 돌려준다.
+    sheet_key를 주면 그 시트의 호출만 센다 (여러 학생이 동시에 실행될 때 학생별로 나누기 위해)."""
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    at.secrets["GOOGLE_CREDENTIALS"] = {"type": "service_account", "fake": True}
+    steps = []
+
+    def step(page, action):
+        before = service.snapshot(sheet_key) if service else None
+        started = time.perf_counter()
+        action()
+        wall = time.perf_counter() - started
+        errors = _errors(at)
+        if errors:
+            raise RuntimeError(f"{page} 단계 오류: {errors}")
+        steps.append((page, wall, before, service.snapshot(sheet_key) if service else None))
+
+    def login():
+        at.run()
+        at.text_input(key="s_login_name_vfinal_10").input(name)
+        at.text_input(key="s_login_pw_vfinal_10").input(password)
+        _click(at, "s_login_btn_vfinal_10")
+
+    step("login", login)
+    step("check_notes", lambda: _click(at, "s_check_new_notes_btn_vfinal_10"))
+    step("menu", lambda: _click(at, "s_notes_to_menu_vfinal_10"))
+    step("write_emotion", lambda: _click(at, "s_menu_write_v10"))
+    step("write_gratitude", lambda: _click(at, "s_emo_n_vfinal_10"))
+
+    def write_message():
+        at.text_area(key="s_grat_txt_vfinal_10").input("벤치마크 감사한 일")
+        _click(at, "s_grat_n_vfinal_10")
+    step("write_message", write_message)
+
+    def confirm_submission():
+        at.text_area(key="s_msg_txt_vfinal_10").input("벤치마크 하고 싶은 말")
+        _click(at, "s_msg_n_vfinal_10")
+    step("confirm_submission", confirm_submission)
+    step("view_diary_only", lambda: _click(at, "s_submit_diary_vfinal_10"))
+    if service is not None:
+        step("background_save", lambda: wait_for_queue_idle(service))
+    return steps
+
+
+def _diff(before, after):
+    calls = {m: after["calls"].get(m, 0) - before["calls"].get(m, 0) for m in after["calls"]}
+    calls = {m: n for m, n in calls.items() if n}
+    return {"api_calls": sum(calls.values()), "calls_by_method": calls,
+            "bytes": after["bytes"] - before["bytes"], "quota_errors": after["quota_errors"] - before["quota_errors"]}
+
+
+def scenario_single(n_rows, args):
+    service = FakeSheetsService(args.latency_ms / 1000.0, args.quota_reads_per_minute, args.quota_writes_per_minute)
+    install_fake(build_fake_backend(1, n_rows, service))
+    workspace = AppWorkspace()
+    try:
+        started = time.perf_counter()
+        steps = run_student_flow(workspace.app_path, "학생0", "100000", service)
+        total_wall = time.perf_counter() - started
+    finally:
+        workspace.close()
+    pages = [dict(page=page, wall_seconds=round(wall, 4), **_diff(before, after)) for page, wall, before, after in steps]
+    totals = service.snapshot()
+    return {"name": f"single-{n_rows}rows", "rows": n_rows, "students": 1, "pages": pages,
+            "totals": {"api_calls": sum(totals["calls"].values()), "calls_by_method": totals["calls"], "bytes": totals["bytes"],
+                       "quota_errors": totals["quota_errors"], "wall_seconds": round(total_wall, 4)}}
+
+
+def scenario_concurrent(n_students, n_rows, args):
+    service = FakeSheetsService(args.latency_ms / 1000.0, args.quota_reads_per_minute, args.quota_writes_per_minute)
+    install_fake(build_fake_backend(n_students, n_rows, service))
+    workspace = AppWorkspace()
+    barrier = threading.Barrier(n_students)
+
+    def one(k):
+        barrier.wait() # 모두 같은 순간에 로그인 시작
+        return run_student_flow(workspace.app_path, f"학생{k}", f"{100000 + k}", service, timeout=args.timeout, sheet_key=student_sheet_url(k))
+
+    try:
+        started = time.perf_counter()
+        with shared_apptest_runtime(), ThreadPoolExecutor(max_workers=n_students) as pool:
+            results = list(pool.map(one, range(n_students)))
+        wait_for_queue_idle(service)
+        total_wall = time.perf_counter() - started
+    finally:
+        workspace.close()
+    by_page = {}
+    for steps in results:
+        for page, wall, before, after in steps:
+            by_page.setdefault(page, []).append((wall, _diff(before, after)))
+    pages = []
+    for page, measured in by_page.items():
+        walls, diffs = [w for w, _ in measured], [d for _, d in measured]
+        calls_by_method = Counter()
+        for d in diffs:
+            calls_by_method.update(d["calls_by_method"])
+        # 호출/바이트는 각 학생 자기 시트에 대한 것의 합 (학생목록처럼 함께 쓰는 시트는 totals의 api_calls_by_sheet에)
+        pages.append({"page": page, "wall_seconds_p50": round(statistics.median(walls), 4),
+                      "wall_seconds_max": round(max(walls), 4), "wall_seconds_mean": round(statistics.fmean(walls), 4),
+                      "api_calls": sum(d["api_calls"] for d in diffs), "api_calls_per_student_max": max(d["api_calls"] for d in diffs),
+                      "calls_by_method": dict(calls_by_method), "bytes": sum(d["bytes"] for d in diffs),
+                      "quota_errors": sum(d["quota_errors"] for d in diffs)})
+    totals = service.snapshot()
+    by_sheet = {key: sum(service.snapshot(key)["calls"].values()) for key in [ROSTER_TITLE] + [student_sheet_url(k) for k in range(n_students)]}
+    return {"name": f"concurrent-{n_students}students-{n_rows}rows", "rows": n_rows, "students": n_students, "pages": pages,
+            "totals": {"api_calls": sum(totals["calls"].values()), "calls_by_method": totals["calls"], "bytes": totals["bytes"],
+                       "quota_errors": totals["quota_errors"], "wall_seconds": round(total_wall, 4), "api_calls_by_sheet": by_sheet}}
+
+
+def scenario_change_detection(n_rows, args):
+    """로그인해서 지난 일기를 본 뒤 공유 캐시를 만료시키며 다시 실행한다.
+    첫 만료는 표식 + 날짜/쪽지 열, 바뀌지 않았으면 표식(get_lastUpdateTime)만, 선생님이 쪽지를 고쳤으면 표식 + 날짜/쪽지 열을 읽어야 한다."""
+    service = FakeSheetsService(args.latency_ms / 1000.0, args.quota_reads_per_minute, args.quota_writes_per_minute)
+    client = build_fake_backend(1, n_rows, service)
+    install_fake(client)
+    worksheet = client.by_url[student_sheet_url(0)]._worksheet
+    workspace = AppWorkspace({"DIARY_CACHE_TTL_SECONDS": CHANGE_DETECTION_TTL_SECONDS})
+    at = AppTest.from_file(workspace.app_path, default_timeout=args.timeout)
+    at.secrets["GOOGLE_CREDENTIALS"] = {"type": "service_account", "fake": True}
+    steps = []
+
+    def step(page, action):
+        before = service.snapshot()
+        started = time.perf_counter()
+        action()
+        wall = time.perf_counter() - started
+        errors = _errors(at)
+        if errors:
+            raise RuntimeError(f"{page} 단계 오류: {errors}")
+        steps.append((page, wall, before, service.snapshot()))
+
+    def expire_and_rerun():
+        time.sleep(CHANGE_DETECTION_TTL_SECONDS + 0.2)
+        at.run()
+
+    def login():
+        at.run()
+        at.text_input(key="s_login_name_vfinal_10").input("학생0")
+        at.text_input(key="s_login_pw_vfinal_10").input("100000")
+        _click(at, "s_login_btn_vfinal_10")
+
+    note = "벤치마크 선생님 쪽지"
+    try:
+        step("login", login)
+        step("menu", lambda: _click(at, "s_notes_to_menu_vfinal_10"))
+        step("view_diary_only", lambda: _click(at, "s_menu_view_v10_renamed"))
+        step("expired_first", expire_and_rerun) # 처음 넣을 때는 표식 없이 넣으므로 열을 읽어 확인
+        step("expired_unchanged", expire_and_rerun)
+        with worksheet._lock: # 선생님이 시트에서 직접 고친 것 (앱의 호출이 아니므로 세지 않음)
+            worksheet._set(len(worksheet._values()), 5, note) # 가장 최근 일기 = 지난 일기 보기의 기본 선택
+        step("expired_teacher_note", expire_and_rerun)
+    finally:
+        workspace.close()
+    if not any(note in str(m.value) for m in at.markdown):
+        raise RuntimeError("고친 선생님 쪽지가 지난 일기 보기에 보이지 않습니다")
+    pages = [dict(page=page, wall_seconds=round(wall, 4), **_diff(before, after)) for page, wall, before, after in steps]
+    totals = service.snapshot()
+    return {"name": f"change-detection-{n_rows}rows", "rows": n_rows, "students": 1, "pages": pages,
+            "totals": {"api_calls": sum(totals["calls"].values()), "calls_by_method": totals["calls"], "bytes": totals["bytes"],
+                       "quota_errors": totals["quota_errors"], "wall_seconds": round(sum(wall for _, wall, _, _ in steps), 4)}}
+
+
+def print_summary(scenarios):
+    for sc in scenarios:
+        t = sc["totals"]
+        print(f"\n== {sc['name']}: {t['api_calls']} calls, {t['bytes']:,} bytes, {t['quota_errors']} quota errors, {t['wall_seconds']:.2f}s")
+        for p in sc["pages"]:
+            if "wall_seconds" in p:
+                print(f"  {p['page']:<20} {p['api_calls']:>4} calls {p['bytes']:>10,} B {p['wall_seconds']:>8.3f}s  {p['calls_by_method']}")
+            else:
+                print(f"  {p['page']:<20} {p['api_calls']:>4} calls {p['bytes']:>10,} B p50 {p['wall_seconds_p50']:>7.3f}s  max {p['wall_seconds_max']:>7.3f}s"
+                      f"  {p['calls_by_method']}")
+        if "api_calls_by_sheet" in t:
+            print(f"  {'(학생목록)':<20} {t['api_calls_by_sheet'][ROSTER_TITLE]:>4} calls")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 365, 2000], help="학생 한 명의 일기 행 수 (시나리오별)")
+    parser.add_argument("--concurrent", type=int, nargs="*", default=[10], help="동시에 로그인하는 학생 수 (시나리오별, 0개면 생략)")
+    parser.add_argument("--concurrent-rows", type=int, default=365, help="동시 시나리오에서 학생별 일기 행 수")
+    parser.add_argument("--change-rows", type=int, default=365, help="변경 확인 시나리오의 일기 행 수 (0이면 생략)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="API 호출 하나당 가짜 지연 (ms)")
+    parser.add_argument("--quota-reads-per-minute", type=int, default=None, help="가짜 API 분당 읽기 한도 (넘으면 429)")
+    parser.add_argument("--quota-writes-per-minute", type=int, default=None, help="가짜 API 분당 쓰기 한도 (넘으면 429)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="AppTest 한 번 실행의 최대 시간 (초)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results.json"))
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario_single(n_rows, args) for n_rows in args.rows]
+    scenarios += [scenario_concurrent(n, args.concurrent_rows, args) for n in args.concurrent if n > 0]
+    if args.change_rows > 0:
+        scenarios.append(scenario_change_detection(args.change_rows, args))
+    report = {"generated_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+              "streamlit": st.__version__, "gspread": gspread.__version__,
+              "config": {k: v for k, v in vars(args).items() if k != "output"}, "scenarios": scenarios}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_summary(scenarios)
+    print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
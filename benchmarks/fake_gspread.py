@@ -0,0 +1,282 @@
+"""벤치마크용 메모리 내 gspread 대역.
+
+학생 앱이 쓰는 Client / Spreadsheet / Worksheet 메서드만 흉내 내고, 모든 호출을 전체와 시트별로 세어 기록한다.
+호출마다 지연 시간을 넣을 수 있고, 분당 읽기/쓰기 한도를 넘으면 실제 API처럼 429 APIError를 낸다.
+시트에 쓸 때마다 Drive 수정 시각(get_lastUpdateTime)이 바뀌므로 변경 확인 후 읽기 생략도 시험할 수 있다.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import gspread
+
+READ_METHODS = {"open", "open_by_url", "get_all_values", "get_all_records", "cell", "col_values", "get", "batch_get", "get_lastUpdateTime", "sheet1"}
+
+
+class _FakeResponse:
+    """gspread.exceptions.APIError가 읽는 requests.Response 대역."""
+    def __init__(self, code, message):
+        self.status_code = code
+        self.text = message
+        self._payload = {"error": {"code": code, "message": message, "status": "RESOURCE_EXHAUSTED"}}
+
+    def json(self):
+        return self._payload
+
+
+class _Cell:
+    def __init__(self, value):
+        self.value = value
+
+
+def _payload_bytes(value):
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _a1_to_row_col(label):
+    m = re.fullmatch(r"([A-Z]*)(\d*)", label)
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + ord(ch) - 64
+    return (int(m.group(2)) if m.group(2) else None), (col or None)
+
+
+class FakeSheetsService:
+    """호출 기록, 지연, 할당량을 관리하는 가짜 Sheets/Drive 서비스 (모든 시트가 공유)."""
+    def __init__(self, latency_seconds=0.0, reads_per_minute=None, writes_per_minute=None):
+        self.latency_seconds = latency_seconds
+        self.reads_per_minute = reads_per_minute
+        self.writes_per_minute = writes_per_minute
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.bytes = 0
+        self.quota_errors = 0
+        self.by_key = defaultdict(lambda: {"calls": Counter(), "bytes": 0, "quota_errors": 0}) # 시트별 호출/바이트
+        self._recent = {"read": deque(), "write": deque()}
+
+    def snapshot(self, key=None):
+        """전체 (key=None) 또는 한 시트(key=URL/제목)의 누적 호출 수, 바이트, 429 횟수."""
+        with self.lock:
+            if key is None:
+                return {"calls": dict(self.calls), "bytes": self.bytes, "quota_errors": self.quota_errors}
+            per_key = self.by_key[key]
+            return {"calls": dict(per_key["calls"]), "bytes": per_key["bytes"], "quota_errors": per_key["quota_errors"]}
+
+    def record(self, method, payload=None, key=None):
+        kind = "read" if method in READ_METHODS else "write"
+        limit = self.reads_per_minute if kind == "read" else self.writes_per_minute
+        with self.lock:
+            now = time.monotonic()
+            window = self._recent[kind]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if limit is not None and len(window) >= limit:
+                self.quota_errors += 1
+                self.by_key[key]["quota_errors"] += 1
+                raise gspread.exceptions.APIError(_FakeResponse(429, f"Quota exceeded for quota metric '{kind} requests' (fake)"))
+            window.append(now)
+            self.calls[method] += 1
+            self.by_key[key]["calls"][method] += 1
+            if payload is not None:
+                self._add_bytes(_payload_bytes(payload), key)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def result(self, value, key=None):
+        # 응답 크기도 전송량에 포함
+        with self.lock:
+            self._add_bytes(_payload_bytes(value), key)
+        return value
+
+    def _add_bytes(self, n, key):
+        self.bytes += n
+        self.by_key[key]["bytes"] += n
+
+
+class FakeWorksheet:
+    def __init__(self, service, rows=None, title="Sheet1", key=None):
+        self.service = service
+        self.key = key # 호출 기록을 모을 시트 이름 (스프레드시트 URL 또는 제목)
+        self.title = title
+        self.id = 0
+        self._rows = [list(r) for r in (rows or [])]
+        self._lock = threading.Lock()
+        self._modified = 0.0
+        self.last_update_time = "1970-01-01T00:00:00.000Z"
+
+    # --- 내부 도우미 ---
+    def _record(self, method, payload=None):
+        self.service.record(method, payload, self.key)
+
+    def _result(self, value):
+        return self.service.result(value, self.key)
+
+    def _touch(self):
+        # Drive modifiedTime 흉내: 쓸 때마다 (같은 밀리초 안이어도) 값이 바뀐다
+        self._modified = max(time.time(), self._modified + 0.001)
+        self.last_update_time = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self._modified)) + f".{int(self._modified * 1000) % 1000:03d}Z"
+
+    def _values(self):
+        rows = [r for r in self._rows]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        width = max((len(r) for r in rows), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in rows]
+
+    def _set(self, row, col, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        target = self._rows[row - 1]
+        while len(target) < col:
+            target.append("")
+        target[col - 1] = "" if value is None else str(value)
+        self._touch()
+
+    def _write_range(self, range_name, values):
+        start = range_name.split("!")[-1].split(":")[0]
+        row0, col0 = _a1_to_row_col(start)
+        for i, row_values in enumerate(values):
+            for j, value in enumerate(row_values):
+                self._set(row0 + i, col0 + j, value)
+
+    def _read_range(self, range_name):
+        values = self._values()
+        parts = range_name.split("!")[-1].split(":")
+        row0, col0 = _a1_to_row_col(parts[0])
+        row1, col1 = _a1_to_row_col(parts[1]) if len(parts) > 1 else (row0, col0)
+        row0, col0 = row0 or 1, col0 or 1
+        row1 = row1 or len(values)
+        col1 = col1 or max((len(r) for r in values), default=1)
+        out = [r[col0 - 1:col1] for r in values[row0 - 1:row1]]
+        while out and not any(out[-1]):
+            out.pop()
+        return out
+
+    def _append(self, rows_to_add):
+        values = self._values()
+        first_row = len(values) + 1
+        self._rows = values + [["" if v is None else str(v) for v in r] for r in rows_to_add]
+        self._touch()
+        last_row = first_row + len(rows_to_add) - 1
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first_row}:E{last_row}", "updatedRows": len(rows_to_add)}}
+
+    # --- gspread Worksheet API ---
+    def get_all_values(self, **kwargs):
+        self._record("get_all_values")
+        with self._lock:
+            return self._result(self._values())
+
+    def get_all_records(self, head=1, **kwargs):
+        self._record("get_all_records")
+        with self._lock:
+            values = self._values()
+        header = values[head - 1] if len(values) >= head else []
+        return self._result([dict(zip(header, r)) for r in values[head:]])
+
+    def cell(self, row, col, **kwargs):
+        self._record("cell")
+        with self._lock:
+            values = self._values()
+        value = values[row - 1][col - 1] if row <= len(values) and col <= len(values[row - 1]) else None
+        return _Cell(self._result(value))
+
+    def col_values(self, col, **kwargs):
+        self._record("col_values")
+        with self._lock:
+            out = [r[col - 1] if col <= len(r) else "" for r in self._values()]
+        while out and not out[-1]:
+            out.pop()
+        return self._result(out)
+
+    def get(self, range_name=None, **kwargs):
+        self._record("get")
+        with self._lock:
+            return self._result(self._read_range(range_name or "A1:ZZ"))
+
+    def batch_get(self, ranges, **kwargs):
+        self._record("batch_get")
+        with self._lock:
+            return self._result([self._read_range(r) for r in ranges])
+
+    def update_cell(self, row, col, value):
+        self._record("update_cell", value)
+        with self._lock:
+            self._set(row, col, value)
+
+    def update(self, *args, **kwargs):
+        # gspread 5 (range, values) / 6 (values, range) 순서를 모두 받는다
+        range_name, values = kwargs.get("range_name"), kwargs.get("values")
+        if args:
+            if isinstance(args[0], str):
+                range_name = args[0]
+                values = args[1] if len(args) > 1 else values
+            else:
+                values = args[0]
+                range_name = args[1] if len(args) > 1 else range_name
+        self._record("update", values)
+        with self._lock:
+            self._write_range(range_name, values)
+
+    def batch_update(self, data, **kwargs):
+        self._record("batch_update", data)
+        with self._lock:
+            for item in data:
+                self._write_range(item["range"], item["values"])
+
+    def append_row(self, values, **kwargs):
+        self._record("append_row", values)
+        with self._lock:
+            return self._append([values])
+
+    def append_rows(self, values, **kwargs):
+        self._record("append_rows", values)
+        with self._lock:
+            return self._append(values)
+
+
+class FakeSpreadsheet:
+    def __init__(self, service, url, worksheet):
+        self.service = service
+        self.url = url
+        self.id = url.rstrip("/").rsplit("/", 1)[-1]
+        self._worksheet = worksheet
+
+    @property
+    def sheet1(self):
+        # 실제 gspread는 sheet1을 읽을 때마다 시트 메타데이터를 요청한다
+        self.service.record("sheet1", key=self._worksheet.key)
+        return self._worksheet
+
+    def get_lastUpdateTime(self):
+        self.service.record("get_lastUpdateTime", key=self._worksheet.key)
+        return self.service.result(getattr(self._worksheet, "last_update_time", "1970-01-01T00:00:00.000Z"), self._worksheet.key)
+
+
+class FakeClient:
+    """gspread.Client 대역. 이름으로 여는 시트(학생목록)와 URL로 여는 학생 시트를 가진다."""
+    def __init__(self, service):
+        self.service = service
+        self.by_title = {}
+        self.by_url = {}
+
+    def add_sheet(self, url=None, title=None, rows=None):
+        spreadsheet = FakeSpreadsheet(self.service, url or f"fake://{title}", FakeWorksheet(self.service, rows, key=url or title))
+        if title:
+            self.by_title[title] = spreadsheet
+        if url:
+            self.by_url[url] = spreadsheet
+        return spreadsheet._worksheet
+
+    def open(self, title, **kwargs):
+        self.service.record("open", key=title)
+        if title not in self.by_title:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self.by_title[title]
+
+    def open_by_url(self, url):
+        self.service.record("open_by_url", key=url)
+        if url not in self.by_url:
+            raise gspread.exceptions.SpreadsheetNotFound(url)
+        return self.by_url[url]
@@ -2,7 +2,25 @@ import streamlit as st
 import pandas as pd
 import gspread 
 from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime
+from datetime import datetime, timedelta
+import bisect
+import re
+import hashlib
+import hmac
+import json
+import os
+import random
+import uuid
+import contextlib
+import abc
+import sqlite3
+import logging
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
 
 # --- 페이지 기본 설정 ---
 st.set_page_config(page_title="감정 일기장 (학생용)", page_icon="📘", layout="centered")
@@ -11,6 +29,53 @@ st.set_page_config(page_title="감정 일기장 (학생용)", page_icon="📘",
 EXPECTED_STUDENT_SHEET_HEADER = ["날짜", "감정", "감사한 일", "하고 싶은 말", "선생님 쪽지"]
 SETTINGS_ROW_DEFAULT = ["설정", "2000-01-01"] 
 
+# --- 학생목록 캐시 설정 ---
+STUDENT_ROSTER_TTL_SECONDS = 300 # 이 시간이 지나면 로그인은 기존 목록으로 처리하면서 백그라운드에서 변경 여부를 확인 (바뀌었을 때만 새로 읽음)
+STUDENT_ROSTER_MIN_RELOAD_SECONDS = 30 # 목록에 없는 이름/로드 실패 시 다시 읽기까지의 최소 간격
+
+# --- 워크시트 핸들 풀 설정 (프로세스 전체 공유) ---
+WORKSHEET_POOL_TTL_SECONDS = 1800 # 핸들 재사용 시간 (초)
+WORKSHEET_POOL_MAX_SIZE = 256 # 동시에 보관할 최대 핸들 수 (오래 안 쓴 것부터 제거)
+
+# --- 일기 저장 대기열 설정 (백그라운드 저장) ---
+DIARY_WRITE_JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diary_write_journal.jsonl") # 저장 전 제출 내용 보관 (재시작 시 재전송)
+DIARY_WRITE_BATCH_WINDOW_SECONDS = 0.5 # 잇따라 들어온 제출을 모아서 한 번에 저장
+DIARY_WRITE_RETRY_BASE_SECONDS = 2
+DIARY_WRITE_RETRY_MAX_SECONDS = 120
+DIARY_WRITE_MAX_ATTEMPTS = 8
+
+# --- 저장소 설정 ---
+# secrets의 DIARY_STORAGE_BACKEND: "gsheets"(기본, 시트에 직접 읽고 씀) 또는 "sqlite"(로컬 DB에서 읽고 시트와 백그라운드 동기화)
+DIARY_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diary_local.sqlite3")
+SQLITE_SYNC_INTERVAL_SECONDS = 60 # 로컬 DB <-> 시트 동기화 주기
+SQLITE_SYNC_ACTIVE_SECONDS = 3600 # 최근 이 시간 안에 열어 본 학생 시트만 시트에서 다시 가져옴
+
+# --- 일기 불러오기 범위 설정 ---
+DIARY_RECENT_WINDOW_DAYS = 14 # 로그인 후 미리 읽는 최근 일기 기간 (오늘 일기 + 최근 쪽지), 그 이전은 필요할 때 날짜 범위로 읽음
+DIARY_RANGE_MERGE_GAP_ROWS = 5 # 읽을 행 사이 간격이 이 이하이면 A1 범위 하나로 합쳐 읽는다
+NOTES_POLL_INTERVAL_SECONDS = 120 # 메뉴의 새 쪽지 표시를 다시 확인하는 간격 (B1 + 날짜/쪽지 열만 읽음)
+NOTES_RESULT_CACHE_MAX_SIZE = 1024 # 시트 변경 표식별로 기억해 두는 새 쪽지 확인 결과 수 (오래 안 쓴 시트부터 제거)
+
+# --- 학생 일기 공유 캐시 설정 (프로세스 전체) ---
+DIARY_CACHE_MAX_BYTES = 64 * 1024 * 1024 # 모든 세션이 함께 쓰는 파싱된 일기의 총 크기 한도 (넘으면 오래 안 쓴 학생부터 내보냄)
+DIARY_CACHE_TTL_SECONDS = 300 # 이 시간이 지나면 시트 변경 표식(Drive 수정 시각)을 확인해 바뀐 경우에만 날짜/쪽지 열과 새 행을 읽는다
+
+# --- 반 전체 미리 불러오기 설정 ---
+# secrets: PREFETCH_ON_STARTUP (true면 앱이 처음 실행될 때 한 번), PREFETCH_SCHEDULE (예: "08:50, 12:50" - 매일 그 시각에 다시 채움)
+PREFETCH_MAX_WORKERS = 4 # 동시에 읽는 학생 시트 수 (읽기 할당량은 스케줄러가 백그라운드 우선순위로 지킨다)
+
+# --- 실행 계측 설정 ---
+# secrets: METRICS_PROMETHEUS_PATH (Prometheus 텍스트 파일 경로), METRICS_HTTP_PORT (/metrics 엔드포인트 포트),
+#          ADMIN_DEBUG_TOKEN (주소에 ?debug=<토큰>을 붙이면 관리자 디버그 패널 표시)
+METRICS_EXPORT_INTERVAL_SECONDS = 15 # Prometheus 파일을 다시 쓰는 최소 간격
+METRICS_HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_RECENT_RERUNS = 50 # 디버그 패널에 보여 줄 최근 rerun 기록 수
+
+# --- Google Sheets API 할당량 설정 (서비스 계정 기준, 분당 요청 수) ---
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+SHEETS_WRITE_REQUESTS_PER_MINUTE = 60
+SHEETS_REQUEST_BURST = 10 # 한꺼번에 보낼 수 있는 최대 요청 수 (어느 1분 동안에도 분당 한도를 넘지 않도록 나머지만 초당 보충)
+
 # --- Helper Functions ---
 @st.cache_resource 
 def authorize_gspread_student_final_v10(): # 버전업
@@ -22,55 +87,1144 @@ def authorize_gspread_student_final_v10(): # 버전업
     except Exception as e:
         st.error(f"Google API 인증 중 오류(학생앱): {e}. secrets 설정을 확인하세요."); st.stop(); return None
 
-@st.cache_data(ttl=600) 
+# --- 실행 계측 (rerun 단계별 시간, Sheets API 호출, 캐시 적중) ---
+class _MetricsHistogram_v10:
+    def __init__(self): self.bucket_counts = [0] * len(METRICS_HISTOGRAM_BUCKETS); self.count = 0; self.sum = 0.0
+
+    def observe(self, value_h):
+        self.count += 1; self.sum += value_h
+        for i_h, bound_h in enumerate(METRICS_HISTOGRAM_BUCKETS):
+            if value_h <= bound_h: self.bucket_counts[i_h] += 1
+
+class RerunRecord_v10:
+    """rerun 한 번의 기록: 단계별 시간(auth, roster, diary_load, page_render), Sheets 호출, 캐시 적중 여부."""
+    def __init__(self, page_r):
+        self.page = page_r
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.phases = {}
+        self.gspread_calls = [] # (메서드, 초, 합쳐진 호출 여부, 오류 여부)
+        self.cache = {} # 캐시 이름 -> hit / miss / stale
+        self.total_seconds = None
+
+    @contextlib.contextmanager
+    def phase(self, name_r):
+        started_r = time.perf_counter()
+        try: yield
+        finally: self.phases[name_r] = self.phases.get(name_r, 0.0) + time.perf_counter() - started_r
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self._started
+        # 따로 잰 단계를 뺀 나머지는 페이지 그리기 시간
+        self.phases["page_render"] = max(self.total_seconds - sum(v_r for k_r, v_r in self.phases.items() if k_r != "page_render"), 0.0)
+
+    def as_dict(self):
+        return {"event": "rerun", "ts": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"), "page": self.page,
+                "total_seconds": round(self.total_seconds or 0.0, 4), "phases": {k_r: round(v_r, 4) for k_r, v_r in self.phases.items()},
+                "gspread_calls": [{"method": m_r, "seconds": round(t_r, 4), "coalesced": c_r, "error": e_r} for m_r, t_r, c_r, e_r in self.gspread_calls],
+                "cache": dict(self.cache)}
+
+class _MetricsHttpHandler_v10(BaseHTTPRequestHandler):
+    app_metrics = None
+
+    def do_GET(self):
+        body_h = self.app_metrics.render_prometheus().encode("utf-8")
+        self.send_response(200 if self.path.startswith("/metrics") else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8"); self.end_headers()
+        if self.path.startswith("/metrics"): self.wfile.write(body_h)
+
+    def log_message(self, *args_h): pass
+
+class AppMetrics_v10:
+    """프로세스 전체 계측. rerun마다 구조화 로그(JSON 한 줄)를 남기고 Prometheus 텍스트 형식으로 내보낸다."""
+    def __init__(self, prometheus_path_m=None, http_port_m=None):
+        self.prometheus_path = prometheus_path_m
+        self._lock = threading.Lock()
+        self._local = threading.local() # 스크립트 스레드별 진행 중인 rerun
+        self._phase_seconds = {} # (phase, page) -> 히스토그램
+        self._gspread_seconds = {} # method -> 히스토그램
+        self._gspread_errors = {} # method -> 오류 수
+        self._cache_requests = {} # (cache, result) -> 횟수
+        self._collectors = [] # 다른 구성요소(스케줄러, 저장 대기열)의 지표
+        self.recent_reruns = deque(maxlen=METRICS_RECENT_RERUNS)
+        self._last_export = 0.0
+        self.logger = logging.getLogger("student_diary.metrics")
+        if not self.logger.handlers:
+            handler_m = logging.StreamHandler(sys.stderr); handler_m.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler_m); self.logger.setLevel(logging.INFO); self.logger.propagate = False
+        if http_port_m:
+            handler_cls_m = type("MetricsHttpHandler", (_MetricsHttpHandler_v10,), {"app_metrics": self})
+            try: server_m = ThreadingHTTPServer(("0.0.0.0", int(http_port_m)), handler_cls_m)
+            except Exception as e_m: self.logger.warning(json.dumps({"event": "metrics_http_failed", "error": str(e_m)}, ensure_ascii=False)) # 계측 때문에 앱이 멈추지 않도록
+            else: threading.Thread(target=server_m.serve_forever, daemon=True).start()
+
+    def add_collector(self, collector_m): self._collectors.append(collector_m)
+
+    @contextlib.contextmanager
+    def rerun(self, page_m):
+        record_m = RerunRecord_v10(page_m)
+        self._local.rerun = record_m
+        try: yield record_m
+        finally: # st.rerun()/st.stop()으로 끝나는 실행도 기록
+            self._local.rerun = None
+            record_m.finish()
+            with self._lock:
+                for phase_m, seconds_m in record_m.phases.items():
+                    self._phase_seconds.setdefault((phase_m, page_m), _MetricsHistogram_v10()).observe(seconds_m)
+                self.recent_reruns.append(record_m.as_dict())
+            self.logger.info(json.dumps(record_m.as_dict(), ensure_ascii=False))
+            self.maybe_export()
+
+    def record_gspread_call(self, method_m, seconds_m, coalesced_m=False, error_m=False):
+        if not coalesced_m: # 실제로 나간 호출만 지연 분포에 포함
+            with self._lock:
+                self._gspread_seconds.setdefault(method_m, _MetricsHistogram_v10()).observe(seconds_m)
+                if error_m: self._gspread_errors[method_m] = self._gspread_errors.get(method_m, 0) + 1
+        rerun_m = getattr(self._local, "rerun", None)
+        if rerun_m is not None: rerun_m.gspread_calls.append((method_m, seconds_m, coalesced_m, error_m))
+
+    def record_cache(self, cache_m, result_m):
+        with self._lock: self._cache_requests[(cache_m, result_m)] = self._cache_requests.get((cache_m, result_m), 0) + 1
+        rerun_m = getattr(self._local, "rerun", None)
+        if rerun_m is not None: rerun_m.cache[cache_m] = result_m
+
+    def render_prometheus(self):
+        def labels_m(**kv_m): return "{" + ",".join(f'{k_m}="{str(v_m).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k_m, v_m in kv_m.items()) + "}"
+        def histogram_m(name_m, help_m, items_m):
+            out_m = [f"# HELP {name_m} {help_m}", f"# TYPE {name_m} histogram"]
+            for label_kv_m, hist_m in items_m:
+                for bound_m, count_m in zip(METRICS_HISTOGRAM_BUCKETS, hist_m.bucket_counts):
+                    out_m.append(f"{name_m}_bucket{labels_m(**label_kv_m, le=bound_m)} {count_m}")
+                out_m.append(f"{name_m}_bucket{labels_m(**label_kv_m, le='+Inf')} {hist_m.count}")
+                out_m.append(f"{name_m}_sum{labels_m(**label_kv_m)} {hist_m.sum:.6f}")
+                out_m.append(f"{name_m}_count{labels_m(**label_kv_m)} {hist_m.count}")
+            return out_m
+        with self._lock:
+            lines_m = histogram_m("student_diary_phase_seconds", "Time spent per rerun phase.",
+                                  [({"phase": ph_m, "page": pg_m}, h_m) for (ph_m, pg_m), h_m in sorted(self._phase_seconds.items())])
+            lines_m += histogram_m("student_diary_gspread_call_seconds", "Latency of Google Sheets API calls (excluding limiter wait).",
+                                   [({"method": mt_m}, h_m) for mt_m, h_m in sorted(self._gspread_seconds.items())])
+            lines_m += ["# HELP student_diary_gspread_call_errors_total Failed Google Sheets API calls.", "# TYPE student_diary_gspread_call_errors_total counter"]
+            lines_m += [f"student_diary_gspread_call_errors_total{labels_m(method=mt_m)} {n_m}" for mt_m, n_m in sorted(self._gspread_errors.items())]
+            lines_m += ["# HELP student_diary_cache_requests_total Cache lookups by result.", "# TYPE student_diary_cache_requests_total counter"]
+            lines_m += [f"student_diary_cache_requests_total{labels_m(cache=c_m, result=r_m)} {n_m}" for (c_m, r_m), n_m in sorted(self._cache_requests.items())]
+        for collector_m in list(self._collectors): # (이름, 종류, 설명, [(라벨 dict, 값)])
+            try:
+                for name_m, type_m, help_m, samples_m in collector_m():
+                    lines_m += [f"# HELP {name_m} {help_m}", f"# TYPE {name_m} {type_m}"]
+                    lines_m += [f"{name_m}{labels_m(**lbl_m) if lbl_m else ''} {val_m}" for lbl_m, val_m in samples_m]
+            except Exception: continue
+        return "\n".join(lines_m) + "\n"
+
+    def maybe_export(self, force_m=False):
+        if not self.prometheus_path: return
+        now_m = time.monotonic()
+        if not force_m and now_m - self._last_export < METRICS_EXPORT_INTERVAL_SECONDS: return
+        self._last_export = now_m
+        try: # 수집기가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+            tmp_path_m = self.prometheus_path + ".tmp"
+            with open(tmp_path_m, "w", encoding="utf-8") as f_m: f_m.write(self.render_prometheus())
+            os.replace(tmp_path_m, self.prometheus_path)
+        except Exception as e_m: self.logger.warning(json.dumps({"event": "metrics_export_failed", "error": str(e_m)}, ensure_ascii=False))
+
+@st.cache_resource
+def get_app_metrics_v10():
+    return AppMetrics_v10(read_secret_v10("METRICS_PROMETHEUS_PATH"), read_secret_v10("METRICS_HTTP_PORT"))
+
+# --- Google Sheets API 스케줄러 (할당량 관리 + 같은 읽기 합치기) ---
+class SheetsTokenBucket_v10:
+    """분당 요청 예산. 사용자 요청(high)이 기다리는 동안에는 백그라운드 요청이 토큰을 가져가지 않는다."""
+    def __init__(self, requests_per_minute_tb, burst_tb):
+        self.capacity = burst_tb
+        self.rate_per_second = max(requests_per_minute_tb - burst_tb, 1) / 60.0
+        self._tokens = float(burst_tb)
+        self._updated = time.monotonic()
+        self._high_waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, high_priority_tb=True):
+        started_tb = time.monotonic()
+        with self._cond:
+            if high_priority_tb: self._high_waiting += 1
+            try:
+                while True:
+                    now_tb = time.monotonic()
+                    self._tokens = min(self.capacity, self._tokens + (now_tb - self._updated) * self.rate_per_second)
+                    self._updated = now_tb
+                    if self._tokens >= 1 and (high_priority_tb or self._high_waiting == 0):
+                        self._tokens -= 1; break
+                    self._cond.wait(max((1 - self._tokens) / self.rate_per_second, 0.05))
+            finally:
+                if high_priority_tb: self._high_waiting -= 1; self._cond.notify_all()
+        return time.monotonic() - started_tb # 대기 시간 (초)
+
+class _SheetsInflightRead_v10:
+    def __init__(self): self.done = threading.Event(); self.result = None; self.error = None
+
+class SheetsApiScheduler_v10:
+    """모든 Sheets 호출이 거치는 관문: 읽기/쓰기 예산 분리, 같은 시트 같은 범위의 동시 읽기는 한 번만 호출."""
+    def __init__(self, reads_per_minute_s, writes_per_minute_s, burst_s, app_metrics_s=None):
+        self.app_metrics = app_metrics_s
+        self.read_bucket = SheetsTokenBucket_v10(reads_per_minute_s, burst_s)
+        self.write_bucket = SheetsTokenBucket_v10(writes_per_minute_s, burst_s)
+        self._inflight = {} # 읽기 키 -> 진행 중인 호출
+        self._generations = {} # 시트 키 -> 쓰기 횟수 (쓰기 이후 시작한 읽기는 이전 호출에 합치지 않음)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics = {"read_calls": 0, "write_calls": 0, "read_wait_seconds_total": 0.0, "write_wait_seconds_total": 0.0,
+                         "read_wait_seconds_max": 0.0, "write_wait_seconds_max": 0.0, "coalesced_reads": 0, "api_errors": 0}
+        if app_metrics_s is not None: app_metrics_s.add_collector(self.prometheus_samples)
+
+    @contextlib.contextmanager
+    def background_priority(self):
+        # 이 스레드의 호출을 백그라운드 우선순위로 (학생 화면 요청이 먼저 토큰을 가져감)
+        previous_s = getattr(self._local, "background", False); self._local.background = True
+        try: yield
+        finally: self._local.background = previous_s
+
+    def _wait_for_token(self, kind_s):
+        bucket_s = self.read_bucket if kind_s == "read" else self.write_bucket
+        waited_s = bucket_s.acquire(not getattr(self._local, "background", False))
+        with self._lock:
+            self._metrics[f"{kind_s}_calls"] += 1
+            self._metrics[f"{kind_s}_wait_seconds_total"] += waited_s
+            self._metrics[f"{kind_s}_wait_seconds_max"] = max(self._metrics[f"{kind_s}_wait_seconds_max"], waited_s)
+
+    def read(self, sheet_key_s, call_key_s, func_s, *args_s, **kwargs_s):
+        with self._lock:
+            key_s = (sheet_key_s, self._generations.get(sheet_key_s, 0), call_key_s)
+            inflight_s = self._inflight.get(key_s)
+            leader_s = inflight_s is None
+            if leader_s: inflight_s = self._inflight[key_s] = _SheetsInflightRead_v10()
+            else: self._metrics["coalesced_reads"] += 1
+        if not leader_s: # 같은 읽기가 이미 진행 중이면 그 결과를 함께 사용
+            started_s = time.perf_counter()
+            inflight_s.done.wait()
+            self._record_call(call_key_s[0], started_s, True, inflight_s.error is not None)
+            if inflight_s.error is not None: raise inflight_s.error
+            return inflight_s.result
+        try:
+            self._wait_for_token("read")
+            started_s = time.perf_counter()
+            try: inflight_s.result = func_s(*args_s, **kwargs_s)
+            except Exception: self._record_call(call_key_s[0], started_s, False, True); raise
+            self._record_call(call_key_s[0], started_s)
+            return inflight_s.result
+        except Exception as e_s:
+            inflight_s.error = e_s
+            with self._lock: self._metrics["api_errors"] += 1
+            raise
+        finally:
+            with self._lock: self._inflight.pop(key_s, None)
+            inflight_s.done.set()
+
+    def write(self, sheet_key_s, method_s, func_s, *args_s, **kwargs_s):
+        self._wait_for_token("write")
+        started_s = time.perf_counter()
+        try:
+            result_s = func_s(*args_s, **kwargs_s)
+            self._record_call(method_s, started_s)
+            return result_s
+        except Exception:
+            self._record_call(method_s, started_s, False, True)
+            with self._lock: self._metrics["api_errors"] += 1
+            raise
+        finally:
+            with self._lock: self._generations[sheet_key_s] = self._generations.get(sheet_key_s, 0) + 1
+
+    def _record_call(self, method_s, started_s, coalesced_s=False, error_s=False):
+        if self.app_metrics is not None: self.app_metrics.record_gspread_call(method_s, time.perf_counter() - started_s, coalesced_s, error_s)
+
+    def prometheus_samples(self):
+        m_s = self.metrics_snapshot()
+        return [("student_diary_sheets_limiter_wait_seconds_total", "counter", "Time spent waiting for the Sheets quota limiter.",
+                 [({"budget": "read"}, m_s["read_wait_seconds_total"]), ({"budget": "write"}, m_s["write_wait_seconds_total"])]),
+                ("student_diary_sheets_limiter_wait_seconds_max", "gauge", "Longest single limiter wait since start.",
+                 [({"budget": "read"}, m_s["read_wait_seconds_max"]), ({"budget": "write"}, m_s["write_wait_seconds_max"])]),
+                ("student_diary_sheets_requests_total", "counter", "Sheets API requests sent through the scheduler.",
+                 [({"budget": "read"}, m_s["read_calls"]), ({"budget": "write"}, m_s["write_calls"])]),
+                ("student_diary_sheets_coalesced_reads_total", "counter", "Reads served by joining an identical in-flight read.", [({}, m_s["coalesced_reads"])]),
+                ("student_diary_sheets_api_errors_total", "counter", "Sheets API calls that raised.", [({}, m_s["api_errors"])])]
+
+    def metrics_snapshot(self):
+        with self._lock:
+            snapshot_s = dict(self._metrics)
+        total_reads_s = snapshot_s["read_calls"] + snapshot_s["coalesced_reads"]
+        snapshot_s["coalesced_read_ratio"] = snapshot_s["coalesced_reads"] / total_reads_s if total_reads_s else 0.0
+        return snapshot_s
+
+class ScheduledWorksheet_v10:
+    """gspread Worksheet 대리 객체 - 읽기/쓰기 메서드는 스케줄러를 거친다."""
+    READ_METHODS = {"get_all_values", "get_all_records", "get_values", "cell", "acell", "col_values", "row_values", "get", "batch_get"}
+    WRITE_METHODS = {"update_cell", "update_acell", "update", "batch_update", "append_row", "append_rows", "batch_clear", "clear"}
+
+    def __init__(self, worksheet_sw, scheduler_sw, sheet_key_sw):
+        self._ws = worksheet_sw; self._scheduler = scheduler_sw; self._sheet_key = sheet_key_sw
+
+    def __getattr__(self, name_sw):
+        attr_sw = getattr(self._ws, name_sw)
+        if name_sw in self.READ_METHODS:
+            return lambda *a_sw, **k_sw: self._scheduler.read(self._sheet_key, (name_sw, repr(a_sw), repr(sorted(k_sw.items()))), attr_sw, *a_sw, **k_sw)
+        if name_sw in self.WRITE_METHODS:
+            return lambda *a_sw, **k_sw: self._scheduler.write(self._sheet_key, name_sw, attr_sw, *a_sw, **k_sw)
+        return attr_sw
+
+class ScheduledSpreadsheet_v10:
+    READ_METHODS = {"get_lastUpdateTime"} # Drive 메타데이터 읽기 (시트 변경 표식)
+
+    def __init__(self, spreadsheet_ss, scheduler_ss, sheet_key_ss):
+        self._spreadsheet = spreadsheet_ss; self._scheduler = scheduler_ss; self._sheet_key = sheet_key_ss
+        self._sheet1 = None
+
+    @property
+    def sheet1(self):
+        # gspread의 sheet1은 부를 때마다 시트 메타데이터를 요청하므로 스케줄러를 거쳐 한 번만 받아 둔다
+        if self._sheet1 is None:
+            worksheet_ss = self._scheduler.read(self._sheet_key, ("sheet1",), lambda: self._spreadsheet.sheet1)
+            self._sheet1 = ScheduledWorksheet_v10(worksheet_ss, self._scheduler, self._sheet_key)
+        return self._sheet1
+
+    def __getattr__(self, name_ss):
+        attr_ss = getattr(self._spreadsheet, name_ss)
+        if name_ss in self.READ_METHODS:
+            return lambda *a_ss, **k_ss: self._scheduler.read(self._sheet_key, (name_ss, repr(a_ss), repr(sorted(k_ss.items()))), attr_ss, *a_ss, **k_ss)
+        return attr_ss
+
+class ScheduledSheetsClient_v10:
+    """인증된 gspread 클라이언트 대리 객체. 스프레드시트 열기(메타데이터 읽기)도 읽기 예산을 쓰고 동시 요청은 합친다."""
+    def __init__(self, client_sc, scheduler_sc):
+        self._client = client_sc; self.scheduler = scheduler_sc
+
+    def open(self, title_sc):
+        return ScheduledSpreadsheet_v10(self.scheduler.read(f"title:{title_sc}", ("open",), self._client.open, title_sc), self.scheduler, f"title:{title_sc}")
+
+    def open_by_url(self, url_sc):
+        return ScheduledSpreadsheet_v10(self.scheduler.read(url_sc, ("open_by_url",), self._client.open_by_url, url_sc), self.scheduler, url_sc)
+
+    def background_priority(self): return self.scheduler.background_priority()
+
+    def __getattr__(self, name_sc): return getattr(self._client, name_sc)
+
+@st.cache_resource
+def get_sheets_scheduler_v10():
+    return SheetsApiScheduler_v10(SHEETS_READ_REQUESTS_PER_MINUTE, SHEETS_WRITE_REQUESTS_PER_MINUTE, SHEETS_REQUEST_BURST, get_app_metrics_v10())
+
+@st.cache_resource
+def get_scheduled_sheets_client_v10(_client_gspread_raw):
+    if not _client_gspread_raw: return None
+    return ScheduledSheetsClient_v10(_client_gspread_raw, get_sheets_scheduler_v10())
+
+def read_sheet_revision_v10(spreadsheet_rev):
+    """시트 변경 표식 = Drive 수정 시각 (시트가 바뀔 때마다 달라짐, 호출 하나로 내용은 받지 않음).
+    얻을 수 없으면(Drive API 미사용 등) None - 호출한 쪽은 표식 없이 예전처럼 다시 읽는다."""
+    try: return spreadsheet_rev.get_lastUpdateTime()
+    except Exception: return None
+
+def fetch_students_df_v10(roster_spreadsheet):
+    """'학생목록' 시트를 읽고 필수 열을 점검 (오류는 호출한 쪽에서 처리)."""
+    student_list_ws_s_app_v10 = roster_spreadsheet.sheet1
+    df_s_app_v10 = pd.DataFrame(student_list_ws_s_app_v10.get_all_records(head=1)) 
+    if not df_s_app_v10.empty:
+        required_cols_s_app_v10 = ["이름", "비밀번호", "시트URL"]
+        for col_s_app_v10 in required_cols_s_app_v10:
+            if col_s_app_v10 not in df_s_app_v10.columns:
+                raise ValueError(f"'학생목록' 시트에 필수 열인 '{col_s_app_v10}'이(가) 없습니다. 확인해주세요.")
+    return df_s_app_v10
+
+def hash_student_password_v10(password_raw):
+    return hashlib.sha256(str(password_raw).strip().encode("utf-8")).hexdigest()
+
+def build_student_login_index_v10(df_roster):
+    # 이름 -> (비밀번호 해시, 시트URL). 같은 이름이 여럿이면 첫 행 사용 (기존 동작과 동일)
+    index_roster_v10 = {}
+    if df_roster.empty: return index_roster_v10
+    for name_r_v10, pw_r_v10, url_r_v10 in zip(df_roster["이름"], df_roster["비밀번호"], df_roster["시트URL"]):
+        index_roster_v10.setdefault(str(name_r_v10).strip(), (hash_student_password_v10(pw_r_v10), url_r_v10))
+    return index_roster_v10
+
+class StudentRoster_v10:
+    """학생목록 + 로그인 색인. TTL이 지나도 기존 목록으로 계속 응답하고 새 목록은 백그라운드에서 한 번만 읽는다."""
+    def __init__(self, client_roster, ttl_seconds_roster):
+        self.client = client_roster
+        self.ttl_seconds = ttl_seconds_roster
+        self.df = None
+        self.index = {}
+        self.error = None
+        self._loaded_at = 0.0
+        self._last_attempt = 0.0
+        self._refreshing = False
+        self._spreadsheet = None # 한 번 연 '학생목록' (다시 읽을 때 open 생략)
+        self._revision = None # 지금 목록을 읽었을 때의 시트 변경 표식
+        self._lock = threading.Lock()
+        self._load_lock = threading.RLock()
+
+    def _reload(self):
+        with self._load_lock:
+            self._last_attempt = time.monotonic()
+            try:
+                if self._spreadsheet is None: self._spreadsheet = self.client.open("학생목록")
+                # 표식을 먼저 읽는다 (읽는 도중 바뀌면 다음 확인에서 다시 읽도록). 처음 읽을 때는 비교할 것이 없으므로 생략
+                revision_roster_v10 = read_sheet_revision_v10(self._spreadsheet) if self.df is not None else None
+                if self.df is not None and revision_roster_v10 is not None and revision_roster_v10 == self._revision:
+                    with self._lock: self.error, self._loaded_at = None, time.monotonic() # 바뀌지 않았으면 전체 읽기 생략
+                    return True
+                df_roster_v10 = fetch_students_df_v10(self._spreadsheet)
+                index_roster_v10 = build_student_login_index_v10(df_roster_v10)
+            except Exception as e_roster:
+                self._spreadsheet = None # 시트가 바뀌었거나 권한 문제일 수 있으므로 다음에는 새로 연다
+                self.error = e_roster; return False
+            with self._lock: # 목록과 색인을 한 번에 교체
+                self.df, self.index, self.error, self._loaded_at, self._revision = df_roster_v10, index_roster_v10, None, time.monotonic(), revision_roster_v10
+            return True
+
+    def _reload_in_background(self):
+        try:
+            with getattr(self.client, "background_priority", contextlib.nullcontext)(): self._reload()
+        finally: self._refreshing = False
+
+    def ensure_loaded(self):
+        now_roster_v10 = time.monotonic()
+        if self.df is None:
+            with self._load_lock: # 다른 세션이 처음 읽는 중이면 끝날 때까지 기다렸다가 그 결과를 사용
+                if self.df is None and (not self._last_attempt or now_roster_v10 - self._last_attempt >= STUDENT_ROSTER_MIN_RELOAD_SECONDS): self._reload()
+            return
+        if now_roster_v10 - self._loaded_at >= self.ttl_seconds:
+            with self._lock:
+                if self._refreshing: return
+                self._refreshing = True
+            threading.Thread(target=self._reload_in_background, daemon=True).start()
+
+    def cache_state(self):
+        # 계측용: 목록이 없으면 miss, TTL이 지났으면 stale (백그라운드 갱신 중), 아니면 hit
+        if self.df is None: return "miss"
+        return "stale" if time.monotonic() - self._loaded_at >= self.ttl_seconds else "hit"
+
+    def lookup(self, name_lookup):
+        entry_roster_v10 = self.index.get(name_lookup)
+        if entry_roster_v10 is None and self._refreshing:
+            with self._load_lock: entry_roster_v10 = self.index.get(name_lookup) # 백그라운드 갱신 중이면 끝난 뒤의 목록으로 확인
+        # 새로 추가된 학생일 수 있으므로 목록을 한 번 더 읽어 본다 (최소 간격 제한)
+        if entry_roster_v10 is None and time.monotonic() - self._last_attempt >= STUDENT_ROSTER_MIN_RELOAD_SECONDS:
+            if self._reload(): entry_roster_v10 = self.index.get(name_lookup)
+        return entry_roster_v10
+
+@st.cache_resource
+def get_student_roster_v10(_client_gspread_student):
+    return StudentRoster_v10(_client_gspread_student, STUDENT_ROSTER_TTL_SECONDS)
+
 def get_students_df_for_student_app_v10(_client_gspread_student):
     if not _client_gspread_student: return pd.DataFrame()
+    roster_s_app_v10 = get_student_roster_v10(_client_gspread_student)
+    get_app_metrics_v10().record_cache("roster", roster_s_app_v10.cache_state())
+    roster_s_app_v10.ensure_loaded()
+    if roster_s_app_v10.df is not None: return roster_s_app_v10.df
+    e = roster_s_app_v10.error
+    if isinstance(e, gspread.exceptions.SpreadsheetNotFound):
+        st.error("'학생목록' 스프레드시트를 찾을 수 없습니다. 이름을 확인하고 공유 설정을 점검하세요.")
+    elif isinstance(e, ValueError): st.error(str(e))
+    elif e is not None: st.error(f"학생 목록 로딩 중 오류(학생앱): {e}. '학생목록' 시트 내용을 확인하세요.")
+    return pd.DataFrame()
+
+def record_from_row_values_s_app_v10(r_vals_s_app_v10, expected_header_list_s):
+    rec_s_app_v10 = {}
+    for i_s_app_v10, header_name_s_app_v10 in enumerate(expected_header_list_s):
+        rec_s_app_v10[header_name_s_app_v10] = r_vals_s_app_v10[i_s_app_v10] if i_s_app_v10 < len(r_vals_s_app_v10) else None
+    return rec_s_app_v10
+
+def records_from_values_s_app_v10(all_values_s, expected_header_list_s):
+    """get_all_values() 결과(1행 설정, 2행 헤더)에서 3행부터 레코드 목록을 만든다."""
+    if len(all_values_s) < 2: return [] 
+    return [record_from_row_values_s_app_v10(r_vals_s_app_v10, expected_header_list_s) for r_vals_s_app_v10 in all_values_s[2:]]
+
+def merge_row_spans_v10(sheet_rows_m, max_gap_m=DIARY_RANGE_MERGE_GAP_ROWS):
+    """시트 행 번호 목록 -> 읽을 범위 [(첫 행, 끝 행), ...]. 가까운 행은 한 범위로 합쳐 API 요청 수를 줄인다."""
+    spans_m = []
+    for row_m in sorted(sheet_rows_m):
+        if spans_m and row_m - spans_m[-1][1] <= max_gap_m + 1: spans_m[-1][1] = max(spans_m[-1][1], row_m)
+        else: spans_m.append([row_m, row_m])
+    return [tuple(span_m) for span_m in spans_m]
+
+def parse_diary_date_v10(date_text_v10):
+    try: return datetime.strptime(str(date_text_v10).strip(), "%Y-%m-%d").date()
+    except ValueError: return None
+
+def date_note_columns_v10(dates_values_v10, notes_values_v10):
+    """batch_get으로 읽은 A열(날짜)/E열(쪽지) -> (날짜 목록, 같은 길이의 쪽지 목록). 끝쪽 빈 칸은 응답에서 빠지므로 채운다."""
+    dates_col_v10 = [str(r_v10[0]).strip() if r_v10 else "" for r_v10 in dates_values_v10]
+    notes_col_v10 = [r_v10[0] if r_v10 else "" for r_v10 in notes_values_v10][:len(dates_col_v10)]
+    return dates_col_v10, notes_col_v10 + [""] * (len(dates_col_v10) - len(notes_col_v10))
+
+def new_notes_from_columns_v10(last_checked_text_v10, dates_v10, notes_v10):
+    """날짜 열/쪽지 열에서 마지막 확인 날짜(B1) 이후의 선생님 쪽지 [(날짜, 쪽지), ...] (날짜순)."""
+    last_checked_dt_v10 = parse_diary_date_v10(last_checked_text_v10) or parse_diary_date_v10(SETTINGS_ROW_DEFAULT[1])
+    n_v10 = min(len(dates_v10), len(notes_v10))
+    dates_s_v10 = pd.Series(list(dates_v10)[:n_v10], dtype=object).fillna("").astype(str).str.strip()
+    notes_s_v10 = pd.Series(list(notes_v10)[:n_v10], dtype=object).fillna("").astype(str).str.strip()
+    # 행마다 strptime 하지 않고 열 전체를 한 번에 비교 (잘못된 날짜는 NaT -> 제외)
+    mask_v10 = notes_s_v10.ne("") & (pd.to_datetime(dates_s_v10, format="%Y-%m-%d", errors="coerce") > pd.Timestamp(last_checked_dt_v10))
+    return sorted(zip(dates_s_v10[mask_v10], notes_s_v10[mask_v10]), key=lambda x: x[0])
+
+def plan_sheet_structure_fixes_s_app_v10(all_vals_ensure_s_v10, settings_content_s, header_content_s):
+    """이미 읽어 온 시트 값을 보고 필요한 설정행/헤더 수정 목록(batch_update 형식)을 만든다."""
+    header_end_col_letter_v10 = chr(ord('A') + len(header_content_s) - 1)
+    range_header_s_v10 = f'A2:{header_end_col_letter_v10}2'
+    if not all_vals_ensure_s_v10:
+        return [{"range": "A1:B1", "values": [list(settings_content_s)]}, {"range": range_header_s_v10, "values": [list(header_content_s)]}]
+    fixes_s_v10 = []
+    current_r1_s_v10 = all_vals_ensure_s_v10[0]
+    if len(current_r1_s_v10) < 1 or current_r1_s_v10[0] != settings_content_s[0]: fixes_s_v10.append({"range": "A1", "values": [[settings_content_s[0]]]})
+    if len(current_r1_s_v10) < 2 or not current_r1_s_v10[1]: fixes_s_v10.append({"range": "B1", "values": [[settings_content_s[1]]]})
+    if len(all_vals_ensure_s_v10) < 2 or list(all_vals_ensure_s_v10[1][:len(header_content_s)]) != header_content_s:
+        fixes_s_v10.append({"range": range_header_s_v10, "values": [list(header_content_s)]})
+    return fixes_s_v10
+
+def ensure_sheet_structure_s_app_v10(worksheet_to_ensure, settings_content_s, header_content_s, all_values_s=None):
+    """설정행/헤더를 점검하고 수정이 필요하면 batch_update 한 번으로 반영. 점검 완료 시 True."""
     try:
-        student_list_ws_s_app_v10 = _client_gspread_student.open("학생목록").sheet1
-        df_s_app_v10 = pd.DataFrame(student_list_ws_s_app_v10.get_all_records(head=1)) 
-        if not df_s_app_v10.empty:
-            required_cols_s_app_v10 = ["이름", "비밀번호", "시트URL"]
-            for col_s_app_v10 in required_cols_s_app_v10:
-                if col_s_app_v10 not in df_s_app_v10.columns:
-                    st.error(f"'학생목록' 시트에 필수 열인 '{col_s_app_v10}'이(가) 없습니다. 확인해주세요.")
-                    return pd.DataFrame()
-        return df_s_app_v10
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error("'학생목록' 스프레드시트를 찾을 수 없습니다. 이름을 확인하고 공유 설정을 점검하세요."); return pd.DataFrame()
-    except Exception as e:
-        st.error(f"학생 목록 로딩 중 오류(학생앱): {e}. '학생목록' 시트 내용을 확인하세요."); return pd.DataFrame()
-
-def get_records_from_row2_header_s_app_v10(worksheet_s, expected_header_list_s):
-    all_values_s_app_v10 = worksheet_s.get_all_values()
-    if len(all_values_s_app_v10) < 2: return [] 
-    data_rows_s_app_v10 = all_values_s_app_v10[2:]
-    records_s_app_v10 = []
-    for r_vals_s_app_v10 in data_rows_s_app_v10:
-        rec_s_app_v10 = {}
-        for i_s_app_v10, header_name_s_app_v10 in enumerate(expected_header_list_s):
-            rec_s_app_v10[header_name_s_app_v10] = r_vals_s_app_v10[i_s_app_v10] if i_s_app_v10 < len(r_vals_s_app_v10) else None
-        records_s_app_v10.append(rec_s_app_v10)
-    return records_s_app_v10
-
-def ensure_sheet_structure_s_app_v10(worksheet_to_ensure, settings_content_s, header_content_s):
+        if all_values_s is None: all_values_s = worksheet_to_ensure.get_all_values()
+        fixes_s_v10 = plan_sheet_structure_fixes_s_app_v10(all_values_s, settings_content_s, header_content_s)
+        if fixes_s_v10: worksheet_to_ensure.batch_update(fixes_s_v10, value_input_option='USER_ENTERED')
+        return True
+    except Exception: return False
+
+def ensure_sheet_structure_once_s_app_v10(worksheet_s, sheet_url_s, checked_urls_s_v10, all_values_s=None):
+    # checked_urls_s_v10: 구조 점검을 마친 시트 URL (프로세스 전체 공유) - 이후에는 점검 생략
+    if sheet_url_s in checked_urls_s_v10: return
+    if ensure_sheet_structure_s_app_v10(worksheet_s, SETTINGS_ROW_DEFAULT, EXPECTED_STUDENT_SHEET_HEADER, all_values_s):
+        checked_urls_s_v10.add(sheet_url_s)
+
+def load_sheet_records_checked_s_app_v10(worksheet_s, sheet_url_s, checked_urls_s_v10):
+    """get_all_values() 한 번으로 구조 점검과 레코드 변환을 함께 처리."""
+    all_values_s_v10 = worksheet_s.get_all_values()
+    ensure_sheet_structure_once_s_app_v10(worksheet_s, sheet_url_s, checked_urls_s_v10, all_values_s_v10)
+    return records_from_values_s_app_v10(all_values_s_v10, EXPECTED_STUDENT_SHEET_HEADER)
+
+# --- 워크시트 핸들 풀 ---
+class WorksheetHandlePool_v10:
+    """시트 URL별 worksheet 핸들 보관소. open_by_url(메타데이터 API 호출)을 URL당 TTL 동안 한 번만 수행."""
+    def __init__(self, client_pool, ttl_seconds_pool, max_size_pool):
+        self.client = client_pool
+        self.ttl_seconds = ttl_seconds_pool
+        self.max_size = max_size_pool
+        self._handles = OrderedDict() # sheet_url -> (worksheet, 열린 시각, spreadsheet)
+        self.structure_checked_urls = set() # 설정행/헤더 점검을 마친 시트 URL
+        self._lock = threading.Lock()
+
+    def _entry(self, sheet_url_pool):
+        now_pool = time.monotonic()
+        with self._lock:
+            entry_pool = self._handles.get(sheet_url_pool)
+            if entry_pool and now_pool - entry_pool[1] < self.ttl_seconds:
+                self._handles.move_to_end(sheet_url_pool)
+                return entry_pool
+        # 네트워크 호출은 잠금 밖에서 (다른 세션의 조회를 막지 않도록)
+        spreadsheet_pool = self.client.open_by_url(sheet_url_pool)
+        entry_pool = (spreadsheet_pool.sheet1, now_pool, spreadsheet_pool)
+        with self._lock:
+            self._handles[sheet_url_pool] = entry_pool
+            self._handles.move_to_end(sheet_url_pool)
+            while len(self._handles) > self.max_size: self._handles.popitem(last=False)
+        return entry_pool
+
+    def get(self, sheet_url_pool): return self._entry(sheet_url_pool)[0]
+
+    def spreadsheet(self, sheet_url_pool): return self._entry(sheet_url_pool)[2] # 변경 표식(Drive 수정 시각) 읽기용
+
+    def invalidate(self, sheet_url_pool):
+        # 다시 열 때 구조도 다시 점검
+        with self._lock: self._handles.pop(sheet_url_pool, None); self.structure_checked_urls.discard(sheet_url_pool)
+
+@st.cache_resource
+def get_worksheet_pool_v10(_client_gspread_pool):
+    return WorksheetHandlePool_v10(_client_gspread_pool, WORKSHEET_POOL_TTL_SECONDS, WORKSHEET_POOL_MAX_SIZE)
+
+# --- 일기 저장 대기열 (write-behind) ---
+def parse_appended_row_number_v10(append_response_s):
+    # append_row 응답의 updatedRange (예: 'Sheet1!A15:E15')에서 행 번호 추출
     try:
-        all_vals_ensure_s_v10 = worksheet_to_ensure.get_all_values()
-        if not all_vals_ensure_s_v10: 
-            worksheet_to_ensure.append_row(settings_content_s, value_input_option='USER_ENTERED')
-            worksheet_to_ensure.append_row(header_content_s, value_input_option='USER_ENTERED'); return
-        current_r1_s_v10 = all_vals_ensure_s_v10[0]
-        if len(current_r1_s_v10) < 1 or current_r1_s_v10[0] != settings_content_s[0]: worksheet_to_ensure.update_cell(1, 1, settings_content_s[0])
-        if len(current_r1_s_v10) < 2 or not current_r1_s_v10[1]: worksheet_to_ensure.update_cell(1, 2, settings_content_s[1])
-        if len(all_vals_ensure_s_v10) < 2: worksheet_to_ensure.append_row(header_content_s, value_input_option='USER_ENTERED')
-        else:
-            current_r2_s_v10 = all_vals_ensure_s_v10[1]
-            if list(current_r2_s_v10) != header_content_s:
-                try: 
-                    header_end_col_letter_v10 = chr(ord('A') + len(header_content_s) - 1)
-                    range_header_s_v10 = f'A2:{header_end_col_letter_v10}2'
-                    worksheet_to_ensure.update(range_header_s_v10, [header_content_s], value_input_option='USER_ENTERED')
-                except Exception: pass 
-    except Exception: pass
+        m_append_v10 = re.search(r"![A-Z]+(\d+)", append_response_s["updates"]["updatedRange"])
+        return int(m_append_v10.group(1)) if m_append_v10 else None
+    except Exception: return None
+
+def is_retryable_sheets_error_v10(e_api):
+    # 할당량 초과(429)·일시적 서버 오류·네트워크 오류는 재시도, 권한/주소 오류 등은 즉시 실패
+    if not isinstance(e_api, gspread.exceptions.APIError): return not isinstance(e_api, gspread.exceptions.GSpreadException)
+    code_api_v10 = getattr(e_api, "code", None) or getattr(getattr(e_api, "response", None), "status_code", None)
+    return code_api_v10 in (429, 500, 502, 503, 504)
+
+class DiaryWriteQueue_v10:
+    """제출을 즉시 로컬 저널에 기록하고 응답, 시트 저장은 백그라운드 작업자가 모아서 처리 (할당량 오류 시 지수 백오프 재시도)."""
+    def __init__(self, worksheet_pool_q, journal_path_q):
+        self.pool = worksheet_pool_q
+        self.journal_path = journal_path_q
+        self._jobs = OrderedDict() # job_id -> 작업 dict (저장 대기 중)
+        self._status = OrderedDict() # job_id -> (상태 "pending"/"done"/"failed", 시트 행 번호, 오류 메시지)
+        self._superseded = OrderedDict() # job_id -> 같은 날짜를 나중에 제출한 job_id (상태는 나중 작업을 따른다)
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        for job_q in self._read_journal(): self._enqueue(job_q) # 이전 실행에서 저장하지 못한 제출 재전송
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def pending_count(self):
+        with self._cond: return len(self._jobs)
+
+    def prometheus_samples(self):
+        return [("student_diary_write_queue_pending", "gauge", "Diary submissions waiting to be saved to Sheets.", [({}, self.pending_count())])]
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_path, encoding="utf-8") as f_q:
+                return [json.loads(line_q) for line_q in f_q if line_q.strip()]
+        except Exception: return [] # 저널이 없거나 읽을 수 없으면 재전송할 것 없음
+
+    def _append_journal(self, job_q):
+        # _journal_lock을 잡은 채로 호출
+        with open(self.journal_path, "a", encoding="utf-8") as f_q:
+            f_q.write(json.dumps(job_q, ensure_ascii=False) + "\n"); f_q.flush(); os.fsync(f_q.fileno())
+
+    def _rewrite_journal(self):
+        # 저장이 끝난 작업을 저널에서 정리 (남은 작업만 다시 기록).
+        # 남은 작업 복사부터 파일 교체까지 저널 잠금 안에서 - 그 사이에 접수된 제출이 옛 파일에 쓰였다가 덮어써져 사라지지 않도록
+        with self._journal_lock:
+            with self._cond: remaining_q = [{k_q: j_q[k_q] for k_q in ("id", "url", "date", "values")} for j_q in self._jobs.values()]
+            tmp_path_q = self.journal_path + ".tmp"
+            with open(tmp_path_q, "w", encoding="utf-8") as f_q:
+                for job_q in remaining_q: f_q.write(json.dumps(job_q, ensure_ascii=False) + "\n")
+                f_q.flush(); os.fsync(f_q.fileno())
+            os.replace(tmp_path_q, self.journal_path)
+
+    def submit(self, sheet_url_q, date_q, row_values_q):
+        job_q = {"id": uuid.uuid4().hex, "url": sheet_url_q, "date": date_q, "values": list(row_values_q)}
+        with self._journal_lock: # 저널 기록과 대기열 추가를 한 번에 (저널 정리와 엇갈리지 않도록)
+            self._append_journal(job_q) # 저널에 기록된 뒤에 접수 확인
+            with self._cond:
+                self._enqueue(job_q)
+                self._cond.notify()
+        return job_q["id"]
+
+    def _enqueue(self, job_q):
+        # _cond를 잡은 채로 호출. 같은 시트/날짜의 대기 중인 제출은 새 제출로 대체 (재시도 대기 중인 옛 값이 나중에 새 값을 덮어쓰지 않도록)
+        for old_q in [j_q for j_q in self._jobs.values() if j_q["url"] == job_q["url"] and j_q["date"] == job_q["date"]]:
+            self._jobs.pop(old_q["id"])
+            self._superseded[old_q["id"]] = job_q["id"]
+            while len(self._superseded) > 10000: self._superseded.popitem(last=False)
+        self._jobs[job_q["id"]] = dict(job_q, attempts=0, next_try=0.0)
+        self._set_status(job_q["id"], "pending")
+
+    def status(self, job_id_q):
+        with self._cond:
+            while job_id_q in self._superseded: job_id_q = self._superseded[job_id_q]
+            return self._status.get(job_id_q, (None, None, None))
+
+    def _set_status(self, job_id_q, state_q, row_q=None, error_q=None):
+        self._status[job_id_q] = (state_q, row_q, error_q)
+        self._status.move_to_end(job_id_q)
+        while len(self._status) > 10000: self._status.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now_q = time.monotonic()
+                    if any(j_q["next_try"] <= now_q for j_q in self._jobs.values()): break
+                    wait_q = min((j_q["next_try"] for j_q in self._jobs.values()), default=None)
+                    self._cond.wait(None if wait_q is None else max(wait_q - now_q, 0.01))
+            time.sleep(DIARY_WRITE_BATCH_WINDOW_SECONDS) # 가까이 들어온 제출을 한 묶음으로
+            with self._cond:
+                # 저장할 때가 된 시트는 그 시트의 대기 작업을 모두 함께 저장 (재시도 대기 중인 것 포함)
+                now_q = time.monotonic()
+                due_urls_q = {j_q["url"] for j_q in self._jobs.values() if j_q["next_try"] <= now_q}
+                batch_q = [j_q for j_q in self._jobs.values() if j_q["url"] in due_urls_q]
+            by_url_q = OrderedDict()
+            for job_q in batch_q: by_url_q.setdefault(job_q["url"], []).append(job_q)
+            for url_q, jobs_url_q in by_url_q.items():
+                try: self._flush_sheet(url_q, jobs_url_q)
+                except Exception as e_q: self._handle_failure(url_q, jobs_url_q, e_q)
+            try: self._rewrite_journal()
+            except Exception: pass
+
+    def _flush_sheet(self, sheet_url_q, jobs_q):
+        latest_q = OrderedDict() # 같은 날짜는 마지막 제출만 저장
+        for job_q in jobs_q: latest_q[job_q["date"]] = job_q
+        ws_q = self.pool.get(sheet_url_q)
+        ensure_sheet_structure_once_s_app_v10(ws_q, sheet_url_q, self.pool.structure_checked_urls)
+        # A열(날짜)만 읽어 행 위치 확인 - 다른 기기에서 이미 쓴 날짜도 수정으로 처리
+        rows_q = {}
+        for i_q, d_q in enumerate(ws_q.col_values(1)):
+            if i_q >= 2 and d_q and d_q not in rows_q: rows_q[d_q] = i_q + 1
+        updates_q = [{"range": f"A{rows_q[d_q]}:{chr(ord('A') + len(j_q['values']) - 1)}{rows_q[d_q]}", "values": [j_q["values"]]}
+                     for d_q, j_q in latest_q.items() if d_q in rows_q]
+        appends_q = [d_q for d_q in latest_q if d_q not in rows_q]
+        if updates_q: ws_q.batch_update(updates_q, value_input_option='USER_ENTERED')
+        if appends_q:
+            resp_q = ws_q.append_rows([latest_q[d_q]["values"] + [""] for d_q in appends_q], value_input_option='USER_ENTERED')
+            first_row_q = parse_appended_row_number_v10(resp_q)
+            for k_q, d_q in enumerate(appends_q): rows_q[d_q] = first_row_q + k_q if first_row_q else None
+        with self._cond:
+            for job_q in jobs_q:
+                self._jobs.pop(job_q["id"], None)
+                if job_q["id"] not in self._superseded: self._set_status(job_q["id"], "done", rows_q.get(job_q["date"]))
+
+    def _handle_failure(self, sheet_url_q, jobs_q, e_q):
+        retryable_q = is_retryable_sheets_error_v10(e_q)
+        if not retryable_q: self.pool.invalidate(sheet_url_q) # 시트 삭제/권한 변경 등 - 다음에는 새로 연다
+        with self._cond:
+            for job_q in jobs_q:
+                if job_q["id"] not in self._jobs: continue # 저장하는 사이 새 제출로 대체됨
+                job_q["attempts"] += 1
+                if not retryable_q or job_q["attempts"] >= DIARY_WRITE_MAX_ATTEMPTS:
+                    self._jobs.pop(job_q["id"], None)
+                    self._set_status(job_q["id"], "failed", None, str(e_q))
+                else:
+                    delay_q = min(DIARY_WRITE_RETRY_BASE_SECONDS * 2 ** (job_q["attempts"] - 1), DIARY_WRITE_RETRY_MAX_SECONDS)
+                    job_q["next_try"] = time.monotonic() + delay_q + random.uniform(0, DIARY_WRITE_RETRY_BASE_SECONDS)
+
+@st.cache_resource
+def get_diary_write_queue_v10(_client_gspread_queue):
+    queue_v10 = DiaryWriteQueue_v10(get_worksheet_pool_v10(_client_gspread_queue), DIARY_WRITE_JOURNAL_PATH)
+    get_app_metrics_v10().add_collector(queue_v10.prometheus_samples)
+    return queue_v10
+
+# --- 학생 일기 공유 캐시 (크기 제한 LRU) ---
+class SharedDiaryCache_v10:
+    """파싱한 학생 일기(StudentDiaryStore_v10)를 시트 URL별로 프로세스 전체에서 공유.
+    같은 학생의 여러 기기/재접속은 같은 객체를 읽고, 제출하면 그 객체를 바로 고친다. 총 크기(바이트)가 한도를 넘으면 가장 오래 안 쓴 것부터 내보낸다.
+    TTL이 지난 항목도 바로 버리지 않는다 - 읽었을 때의 시트 변경 표식과 비교해 바뀌지 않았으면 그대로 다시 쓴다 (revalidate_shared_diary_v10)."""
+    def __init__(self, max_bytes_c, ttl_seconds_c):
+        self.max_bytes = max_bytes_c
+        self.ttl_seconds = ttl_seconds_c
+        self._entries = OrderedDict() # 시트URL -> [저장소, 크기(바이트), 읽은(확인한) 시각, 시트 변경 표식] (뒤쪽일수록 최근 사용)
+        self.total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, sheet_url_c):
+        # TTL 안의 항목만 (지난 항목은 revalidate_shared_diary_v10로 확인 후 사용)
+        with self._lock:
+            entry_c = self._entries.get(sheet_url_c)
+            if entry_c is None or time.monotonic() - entry_c[2] >= self.ttl_seconds: return None
+            self._entries.move_to_end(sheet_url_c)
+            return entry_c[0]
+
+    def peek(self, sheet_url_c):
+        # TTL과 관계없이 (저장소, 시트 변경 표식) - 제출 반영과 변경 확인용
+        with self._lock:
+            entry_c = self._entries.get(sheet_url_c)
+            return (entry_c[0], entry_c[3]) if entry_c is not None else None
+
+    def is_fresh(self, sheet_url_c):
+        with self._lock:
+            entry_c = self._entries.get(sheet_url_c)
+            return entry_c is not None and time.monotonic() - entry_c[2] < self.ttl_seconds
+
+    def put(self, sheet_url_c, store_c, revision_c=None):
+        size_c = store_c.approx_bytes()
+        with self._lock:
+            if sheet_url_c in self._entries: self._drop(sheet_url_c)
+            self._entries[sheet_url_c] = [store_c, size_c, time.monotonic(), revision_c]
+            self.total_bytes += size_c
+            self._evict()
+
+    def mark_fresh(self, sheet_url_c, revision_c):
+        # 변경 확인을 마친 항목: TTL을 새로 시작하고 표식 교체 (내용을 고쳤을 수 있으므로 크기도 다시 계산)
+        with self._lock:
+            entry_c = self._entries.get(sheet_url_c)
+            if entry_c is None: return
+            entry_c[2], entry_c[3] = time.monotonic(), revision_c
+            self._entries.move_to_end(sheet_url_c)
+        self.resize(sheet_url_c)
+
+    def resize(self, sheet_url_c):
+        # 저장소가 커진 뒤(지난 일기 추가, 제출) 크기를 다시 계산
+        with self._lock: entry_c = self._entries.get(sheet_url_c)
+        if entry_c is None: return
+        size_c = entry_c[0].approx_bytes()
+        with self._lock:
+            if self._entries.get(sheet_url_c) is not entry_c: return
+            self.total_bytes += size_c - entry_c[1]; entry_c[1] = size_c
+            self._evict()
+
+    def invalidate(self, sheet_url_c):
+        with self._lock:
+            if sheet_url_c in self._entries: self._drop(sheet_url_c)
+
+    def _drop(self, sheet_url_c):
+        self.total_bytes -= self._entries.pop(sheet_url_c)[1]
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1: # 방금 쓴 항목 하나는 남긴다
+            self._drop(next(iter(self._entries))); self.evictions += 1
+
+    def prometheus_samples(self):
+        with self._lock: entries_c, bytes_c, evictions_c = len(self._entries), self.total_bytes, self.evictions
+        return [("student_diary_cache_entries", "gauge", "Parsed student diaries held in the shared cache.", [({}, entries_c)]),
+                ("student_diary_cache_bytes", "gauge", "Approximate size of the shared diary cache.", [({}, bytes_c)]),
+                ("student_diary_cache_evictions_total", "counter", "Diaries evicted from the shared cache to stay under the byte limit.", [({}, evictions_c)])]
+
+@st.cache_resource
+def get_shared_diary_cache_v10():
+    cache_v10 = SharedDiaryCache_v10(DIARY_CACHE_MAX_BYTES, DIARY_CACHE_TTL_SECONDS)
+    get_app_metrics_v10().add_collector(cache_v10.prometheus_samples)
+    return cache_v10
+
+def revalidate_shared_diary_v10(diary_backend_rv, diary_cache_rv, sheet_url_rv, since_date_rv):
+    """TTL이 지난 공유 캐시 항목을 시트 변경 표식으로 확인 (백그라운드 스레드에서도 사용).
+    표식이 같으면 그대로 다시 쓰고, 다르면 바뀐 부분(날짜/쪽지 열, 새로 생긴 최근 행)만 읽어 반영한다.
+    -> ("revalidated" / "refreshed", 확인한 저장소), 처음부터 다시 읽어야 하면 None (항목 없음, 표식 없음, 행 삭제/정렬 등).
+    저장소를 함께 돌려주므로 그 사이 캐시에서 내보내졌어도 호출한 쪽은 그대로 쓸 수 있다."""
+    entry_rv = diary_cache_rv.peek(sheet_url_rv)
+    if entry_rv is None: return None
+    store_rv, cached_revision_rv = entry_rv
+    revision_rv = diary_backend_rv.revision(sheet_url_rv)
+    if revision_rv is None: return None
+    if revision_rv == cached_revision_rv: outcome_rv = "revalidated"
+    elif diary_backend_rv.refresh_entries(sheet_url_rv, store_rv, since_date_rv): outcome_rv = "refreshed"
+    else: return None
+    diary_cache_rv.mark_fresh(sheet_url_rv, revision_rv)
+    return outcome_rv, store_rv
+
+# --- 반 전체 미리 불러오기 (공유 캐시 채우기) ---
+def parse_prefetch_schedule_v10(schedule_text_v10):
+    """"08:50, 12:50" (또는 secrets 목록) -> [(시, 분), ...]"""
+    return sorted({(int(h_v10), int(m_v10)) for h_v10, m_v10 in re.findall(r"(\d{1,2}):(\d{2})", str(schedule_text_v10 or "")) if int(h_v10) < 24 and int(m_v10) < 60})
+
+def next_prefetch_time_v10(now_v10, schedule_v10):
+    candidates_v10 = [now_v10.replace(hour=h_v10, minute=m_v10, second=0, microsecond=0) + timedelta(days=d_v10)
+                      for d_v10 in (0, 1) for h_v10, m_v10 in schedule_v10]
+    return min(c_v10 for c_v10 in candidates_v10 if c_v10 > now_v10)
+
+class ClassPrefetchJob_v10:
+    """학생목록의 모든 학생 시트를 제한된 스레드 풀로 미리 읽어 공유 캐시에 채운다 (수업 시작 전 한꺼번에 몰리는 첫 로그인 대비).
+    모든 읽기는 백그라운드 우선순위로 스케줄러를 거치므로 할당량을 넘지 않고, 로그인한 학생의 요청이 먼저 처리된다."""
+    def __init__(self, diary_backend_p, diary_cache_p, store_factory_p, schedule_p, max_workers_p, logger_p):
+        self.backend = diary_backend_p
+        self.diary_cache = diary_cache_p
+        self.store_factory = store_factory_p # StudentDiaryStore_v10 (스크립트에서 정의한 클래스를 만들 때 받아 둔다)
+        self.schedule = schedule_p
+        self.max_workers = max_workers_p
+        self.logger = logger_p
+        self._lock = threading.Lock()
+        self._running = False
+        self.progress = {"state": "idle", "total": 0, "done": 0, "skipped": 0, "failed": 0, "failures": [], "started_at": None, "finished_at": None}
+        if self.schedule: threading.Thread(target=self._schedule_loop, daemon=True).start()
+
+    def progress_snapshot(self):
+        with self._lock: return dict(self.progress, failures=list(self.progress["failures"]))
+
+    def start(self, sheet_urls_p):
+        """백그라운드에서 한 번 실행 (이미 실행 중이면 False)."""
+        urls_p = list(dict.fromkeys(str(u_p).strip() for u_p in sheet_urls_p if str(u_p or "").strip()))
+        with self._lock:
+            if self._running: return False
+            self._running = True
+            self.progress = {"state": "running", "total": len(urls_p), "done": 0, "skipped": 0, "failed": 0, "failures": [],
+                             "started_at": datetime.now().isoformat(timespec="seconds"), "finished_at": None}
+        threading.Thread(target=self._run, args=(urls_p,), daemon=True).start()
+        return True
+
+    def _prefetch_one(self, sheet_url_p, since_date_p):
+        with getattr(self.backend.client, "background_priority", contextlib.nullcontext)():
+            if self.diary_cache.is_fresh(sheet_url_p): return "skipped"
+            if revalidate_shared_diary_v10(self.backend, self.diary_cache, sheet_url_p, since_date_p) is not None: return "skipped" # 바뀐 부분만 반영
+            self.diary_cache.put(sheet_url_p, self.store_factory(*self.backend.load_entries_window(sheet_url_p, since_date_p)))
+            return "done"
+
+    def _run(self, sheet_urls_p):
+        since_date_p = (datetime.today() - timedelta(days=DIARY_RECENT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        started_p = time.monotonic()
+        self.logger.info(json.dumps({"event": "prefetch_started", "sheets": len(sheet_urls_p)}, ensure_ascii=False))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor_p:
+                futures_p = {executor_p.submit(self._prefetch_one, url_p, since_date_p): url_p for url_p in sheet_urls_p}
+                for future_p in as_completed(futures_p):
+                    try: outcome_p, error_p = future_p.result(), None
+                    except Exception as e_p: outcome_p, error_p = "failed", e_p
+                    with self._lock:
+                        self.progress[outcome_p] += 1
+                        if error_p is not None: self.progress["failures"].append((futures_p[future_p], str(error_p)))
+                        finished_p = self.progress["done"] + self.progress["skipped"] + self.progress["failed"]
+                    if error_p is not None:
+                        self.logger.warning(json.dumps({"event": "prefetch_failed", "sheet_url": futures_p[future_p], "error": str(error_p)}, ensure_ascii=False))
+                    if finished_p % 10 == 0 or finished_p == len(sheet_urls_p):
+                        self.logger.info(json.dumps({"event": "prefetch_progress", "finished": finished_p, "total": len(sheet_urls_p)}, ensure_ascii=False))
+        finally:
+            with self._lock:
+                self.progress.update(state="finished", finished_at=datetime.now().isoformat(timespec="seconds"))
+                self._running = False
+                summary_p = {k_p: self.progress[k_p] for k_p in ("total", "done", "skipped", "failed")}
+            self.logger.info(json.dumps({"event": "prefetch_finished", "seconds": round(time.monotonic() - started_p, 2), **summary_p}, ensure_ascii=False))
+
+    def _schedule_loop(self):
+        while True:
+            wait_p = (next_prefetch_time_v10(datetime.now(), self.schedule) - datetime.now()).total_seconds()
+            time.sleep(max(wait_p, 1))
+            try:
+                with getattr(self.backend.client, "background_priority", contextlib.nullcontext)(): self.backend.roster.ensure_loaded()
+                if self.backend.roster.df is not None: self.start(self.backend.roster.df["시트URL"].tolist())
+            except Exception as e_p: self.logger.warning(json.dumps({"event": "prefetch_failed", "error": str(e_p)}, ensure_ascii=False))
+
+    def prometheus_samples(self):
+        p_p = self.progress_snapshot()
+        return [("student_diary_prefetch_sheets", "gauge", "Sheets handled by the latest class prefetch run.",
+                 [({"outcome": k_p}, p_p[k_p]) for k_p in ("total", "done", "skipped", "failed")]),
+                ("student_diary_prefetch_running", "gauge", "1 while a class prefetch run is in progress.", [({}, int(p_p["state"] == "running"))])]
+
+@st.cache_resource
+def get_class_prefetch_job_v10(_diary_backend_prefetch, _store_factory_prefetch, schedule_text_v10):
+    app_metrics_prefetch_v10 = get_app_metrics_v10()
+    job_v10 = ClassPrefetchJob_v10(_diary_backend_prefetch, get_shared_diary_cache_v10(), _store_factory_prefetch,
+                                   parse_prefetch_schedule_v10(schedule_text_v10), PREFETCH_MAX_WORKERS, app_metrics_prefetch_v10.logger)
+    app_metrics_prefetch_v10.add_collector(job_v10.prometheus_samples)
+    return job_v10
+
+# --- 저장소 인터페이스 (Google Sheets / 로컬 SQLite) ---
+class DiaryStorageBackend_v10(abc.ABC):
+    """앱이 쓰는 저장 기능 모음. 학생은 시트URL로 구분하고, 선생님 쪽지는 일기 레코드의 '선생님 쪽지' 열로 함께 읽는다."""
+    prefetch_worthwhile = False # 읽을 때마다 API 비용이 들어 반 전체 미리 불러오기가 의미 있는 저장소인지
+    @abc.abstractmethod
+    def roster_available(self): ... # 로그인할 학생목록이 있는지
+    @abc.abstractmethod
+    def lookup_student(self, name_b): ... # 이름 -> (비밀번호 해시, 시트URL) 또는 None
+    @abc.abstractmethod
+    def load_entries(self, sheet_url_b): ... # 일기 레코드 목록 (EXPECTED_STUDENT_SHEET_HEADER 키)
+    def load_entries_window(self, sheet_url_b, since_date_b):
+        # -> (전체 날짜 색인 [(행 번호, 날짜)], 읽은 범위 [(첫 행, 끝 행)], {행 번호: 레코드}) - 기본은 전부 읽는다 (로컬 저장소처럼 읽기 비용이 없는 경우)
+        rows_b = {3 + i_b: r_b for i_b, r_b in enumerate(self.load_entries(sheet_url_b))}
+        return [(row_b, r_b.get("날짜")) for row_b, r_b in rows_b.items()], ([(3, 2 + len(rows_b))] if rows_b else []), rows_b
+    def load_entry_rows(self, sheet_url_b, row_spans_b): # 지정한 행 범위의 레코드 {행 번호: 레코드}
+        return {row_b: r_b for row_b, r_b in self.load_entries_window(sheet_url_b, "")[2].items() if any(r0_b <= row_b <= r1_b for r0_b, r1_b in row_spans_b)}
+    def revision(self, sheet_url_b): return None # 내용이 바뀌면 달라지는 싼 표식 (None이면 표식 없음 - 항상 다시 읽는다)
+    def refresh_entries(self, sheet_url_b, store_b, since_date_b): return False # 이미 읽어 둔 저장소에 바뀐 부분만 반영 (못 하면 False)
+    @abc.abstractmethod
+    def upsert_entry(self, sheet_url_b, date_b, row_values_b): ... # 날짜 기준 저장 -> 대기 작업 ID (바로 저장됐으면 None)
+    def write_status(self, job_id_b): return ("done", None, None) # (상태, 시트 행 번호, 오류)
+    @abc.abstractmethod
+    def get_last_checked(self, sheet_url_b): ... # 마지막으로 쪽지를 확인한 날짜 (B1)
+    @abc.abstractmethod
+    def set_last_checked(self, sheet_url_b, date_b): ...
+    def find_new_notes(self, sheet_url_b):
+        # -> (마지막 확인 날짜, 그 이후의 선생님 쪽지 [(날짜, 쪽지)]) - 기본은 저장된 일기 전체에서 찾는다
+        last_checked_b = self.get_last_checked(sheet_url_b)
+        records_b = self.load_entries(sheet_url_b)
+        return last_checked_b, new_notes_from_columns_v10(last_checked_b, [r_b.get("날짜") for r_b in records_b], [r_b.get("선생님 쪽지") for r_b in records_b])
+
+class GoogleSheetsDiaryBackend_v10(DiaryStorageBackend_v10):
+    prefetch_worthwhile = True
+    def __init__(self, client_b):
+        # 공유 자원은 만들 때 한 번 받아 둔다 (백그라운드 스레드에서도 그대로 사용)
+        self.client = client_b
+        self.pool = get_worksheet_pool_v10(client_b)
+        self.roster = get_student_roster_v10(client_b)
+        self.queue = get_diary_write_queue_v10(client_b)
+        self._notes_by_revision = OrderedDict() # 시트URL -> (시트 변경 표식, find_new_notes 결과) (뒤쪽일수록 최근 사용)
+        self._notes_lock = threading.Lock()
+
+    def roster_available(self): return not get_students_df_for_student_app_v10(self.client).empty
+
+    def roster_index(self):
+        self.roster.ensure_loaded()
+        return self.roster.index if self.roster.df is not None else None
+
+    def lookup_student(self, name_b): return self.roster.lookup(name_b)
+
+    def load_entries(self, sheet_url_b):
+        try:
+            return load_sheet_records_checked_s_app_v10(self.pool.get(sheet_url_b), sheet_url_b, self.pool.structure_checked_urls)
+        except Exception:
+            self.pool.invalidate(sheet_url_b) # 핸들이 무효(시트 삭제/권한 변경 등)일 수 있으므로 다음 시도에서는 새로 연다
+            raise
+
+    def load_entries_window(self, sheet_url_b, since_date_b):
+        """batch_get 한 번으로 1~2행(구조 점검)과 A열(날짜 색인)만 읽고, since_date_b 이후 행만 범위로 읽는다."""
+        try:
+            ws_b = self.pool.get(sheet_url_b)
+            head_b, dates_b = ws_b.batch_get(["A1:E2", "A3:A"])
+            ensure_sheet_structure_once_s_app_v10(ws_b, sheet_url_b, self.pool.structure_checked_urls, [list(r_b) for r_b in head_b])
+            index_b = [(3 + i_b, str(r_b[0]).strip() if r_b else "") for i_b, r_b in enumerate(dates_b)]
+            spans_b = merge_row_spans_v10([row_b for row_b, date_b in index_b if date_b and date_b >= since_date_b])
+            return index_b, spans_b, (self.load_entry_rows(sheet_url_b, spans_b) if spans_b else {})
+        except Exception:
+            self.pool.invalidate(sheet_url_b)
+            raise
+
+    def load_entry_rows(self, sheet_url_b, row_spans_b):
+        ranges_b = [f"A{r0_b}:E{r1_b}" for r0_b, r1_b in row_spans_b]
+        rows_b = {}
+        for (r0_b, _), values_b in zip(row_spans_b, self.pool.get(sheet_url_b).batch_get(ranges_b)):
+            for offset_b, r_vals_b in enumerate(values_b):
+                rows_b[r0_b + offset_b] = record_from_row_values_s_app_v10(list(r_vals_b), EXPECTED_STUDENT_SHEET_HEADER)
+        return rows_b
+
+    def revision(self, sheet_url_b):
+        try: return read_sheet_revision_v10(self.pool.spreadsheet(sheet_url_b))
+        except Exception: return None
+
+    def refresh_entries(self, sheet_url_b, store_b, since_date_b):
+        """날짜(A)/선생님 쪽지(E) 열만 읽어 저장소에 반영하고, 새로 생긴 최근 행만 범위로 읽는다.
+        일기 본문(B~D)은 이 앱에서 제출할 때만 바뀌고 그때 공유 캐시에 바로 반영되므로 다시 읽지 않는다."""
+        try: dates_b, notes_b = self.pool.get(sheet_url_b).batch_get(["A3:A", "E3:E"])
+        except Exception:
+            self.pool.invalidate(sheet_url_b)
+            raise
+        dates_col_b, notes_col_b = date_note_columns_v10(dates_b, notes_b)
+        if not store_b.merge_date_note_columns([(3 + i_b, d_b) for i_b, d_b in enumerate(dates_col_b)], notes_col_b): return False
+        spans_b = store_b.missing_row_spans(since_date_b, "9999-12-31")
+        return not spans_b or store_b.add_rows(spans_b, self.load_entry_rows(sheet_url_b, spans_b))
+
+    def upsert_entry(self, sheet_url_b, date_b, row_values_b): return self.queue.submit(sheet_url_b, date_b, row_values_b)
+
+    def write_status(self, job_id_b): return self.queue.status(job_id_b)
+
+    def get_last_checked(self, sheet_url_b):
+        ws_b = self.pool.get(sheet_url_b)
+        ensure_sheet_structure_once_s_app_v10(ws_b, sheet_url_b, self.pool.structure_checked_urls)
+        return ws_b.cell(1, 2).value
+
+    def set_last_checked(self, sheet_url_b, date_b): self.pool.get(sheet_url_b).update_cell(1, 2, date_b)
+
+    def find_new_notes(self, sheet_url_b):
+        """batch_get 한 번으로 B1과 날짜(A)/선생님 쪽지(E) 열만 읽는다 (일기 본문은 읽지 않음).
+        시트 변경 표식이 지난번과 같으면 읽지 않고 지난 결과를 쓴다 (메뉴의 주기적 확인)."""
+        with self._notes_lock: cached_b = self._notes_by_revision.get(sheet_url_b)
+        revision_b = self.revision(sheet_url_b) if cached_b is not None else None # 처음 확인할 때는 표식 없이 읽는다 (로그인 직후 호출 수 유지)
+        if revision_b is not None and cached_b[0] == revision_b: return cached_b[1]
+        try: marker_b, dates_b, notes_b = self.pool.get(sheet_url_b).batch_get(["B1", "A3:A", "E3:E"])
+        except Exception:
+            self.pool.invalidate(sheet_url_b)
+            raise
+        last_checked_b = str(marker_b[0][0]).strip() if marker_b and marker_b[0] else None
+        result_b = (last_checked_b, new_notes_from_columns_v10(last_checked_b, *date_note_columns_v10(dates_b, notes_b)))
+        with self._notes_lock:
+            self._notes_by_revision[sheet_url_b] = (revision_b, result_b)
+            self._notes_by_revision.move_to_end(sheet_url_b)
+            while len(self._notes_by_revision) > NOTES_RESULT_CACHE_MAX_SIZE: self._notes_by_revision.popitem(last=False)
+        return result_b
+
+class SQLiteDiaryBackend_v10(DiaryStorageBackend_v10):
+    """로컬 SQLite에서 바로 읽고 쓰기. 시트 백엔드가 주어지면 백그라운드 스레드가 변경분을 시트로 보내고 시트 내용(선생님 쪽지 등)을 가져온다.
+    시트 백엔드 없이 만들면 완전히 오프라인으로 동작 (학생목록은 students 테이블에 직접 넣어 둔다)."""
+    def __init__(self, db_path_b, sheets_backend_b=None):
+        self.sheets = sheets_backend_b
+        self._conn = sqlite3.connect(db_path_b, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._active_urls = {} # 시트URL -> 마지막으로 연 시각
+        self._pulled_urls = set()
+        self._pulled_revisions = {} # 시트URL -> 마지막으로 가져왔을 때의 시트 변경 표식
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS students (name TEXT PRIMARY KEY, password_hash TEXT NOT NULL, sheet_url TEXT NOT NULL)")
+            # dirty: 시트 저장이 확인되지 않은 변경 (0이면 동기화됨, 아니면 변경 순번), push_job: 그 변경을 보낸 저장 대기열 작업 ID
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (sheet_url TEXT NOT NULL, date TEXT NOT NULL, emotion TEXT, gratitude TEXT,
+                                  message TEXT, teacher_note TEXT, dirty INTEGER NOT NULL DEFAULT 0, push_job TEXT, PRIMARY KEY (sheet_url, date))""")
+            if "push_job" not in [c_b[1] for c_b in self._conn.execute("PRAGMA table_info(entries)")]: # 이전 버전에서 만든 DB
+                self._conn.execute("ALTER TABLE entries ADD COLUMN push_job TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_dirty ON entries (dirty) WHERE dirty != 0")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS markers (sheet_url TEXT PRIMARY KEY, last_checked TEXT, dirty INTEGER NOT NULL DEFAULT 0)")
+        if self.sheets is not None: threading.Thread(target=self._sync_loop, daemon=True).start()
+
+    def _query(self, sql_b, params_b=()):
+        with self._lock: return self._conn.execute(sql_b, params_b).fetchall()
+
+    def _execute(self, sql_b, params_b=()):
+        with self._lock, self._conn: self._conn.execute(sql_b, params_b)
+
+    def roster_available(self):
+        if not self._query("SELECT 1 FROM students LIMIT 1") and self.sheets is not None: self._pull_roster()
+        return bool(self._query("SELECT 1 FROM students LIMIT 1"))
+
+    def lookup_student(self, name_b):
+        rows_b = self._query("SELECT password_hash, sheet_url FROM students WHERE name = ?", (name_b,))
+        return tuple(rows_b[0]) if rows_b else None
+
+    def load_entries(self, sheet_url_b):
+        self._active_urls[sheet_url_b] = time.monotonic()
+        if self.sheets is not None and sheet_url_b not in self._pulled_urls: self._pull_entries(sheet_url_b) # 처음 여는 시트는 한 번 가져온다
+        rows_b = self._query("SELECT date, emotion, gratitude, message, teacher_note FROM entries WHERE sheet_url = ? ORDER BY date", (sheet_url_b,))
+        return [dict(zip(EXPECTED_STUDENT_SHEET_HEADER, row_b)) for row_b in rows_b]
+
+    def upsert_entry(self, sheet_url_b, date_b, row_values_b):
+        emotion_b, gratitude_b, message_b = (list(row_values_b[1:4]) + [None] * 3)[:3]
+        self._execute("""INSERT INTO entries (sheet_url, date, emotion, gratitude, message, teacher_note, dirty) VALUES (?, ?, ?, ?, ?, '', ?)
+                         ON CONFLICT (sheet_url, date) DO UPDATE SET emotion = excluded.emotion, gratitude = excluded.gratitude,
+                         message = excluded.message, dirty = excluded.dirty, push_job = NULL""",
+                      (sheet_url_b, date_b, emotion_b, gratitude_b, message_b, time.time_ns()))
+        return None # 로컬 저장으로 확정 (시트 반영은 동기화 스레드가)
+
+    def get_last_checked(self, sheet_url_b):
+        rows_b = self._query("SELECT last_checked FROM markers WHERE sheet_url = ?", (sheet_url_b,))
+        return rows_b[0][0] if rows_b else None
+
+    def set_last_checked(self, sheet_url_b, date_b):
+        self._execute("""INSERT INTO markers (sheet_url, last_checked, dirty) VALUES (?, ?, ?)
+                         ON CONFLICT (sheet_url) DO UPDATE SET last_checked = excluded.last_checked, dirty = excluded.dirty""",
+                      (sheet_url_b, date_b, time.time_ns()))
+
+    # --- 시트 동기화 ---
+    def _pull_roster(self):
+        index_b = self.sheets.roster_index()
+        if index_b is None: return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM students")
+            self._conn.executemany("INSERT INTO students (name, password_hash, sheet_url) VALUES (?, ?, ?)",
+                                   [(name_b, hash_b, url_b) for name_b, (hash_b, url_b) in index_b.items()])
+
+    def _pull_entries(self, sheet_url_b):
+        # 시트 내용을 가져오되, 아직 시트로 보내지 않은 로컬 변경은 덮어쓰지 않는다 (선생님 쪽지는 항상 시트 기준)
+        revision_b = self.sheets.revision(sheet_url_b)
+        if revision_b is not None and self._pulled_revisions.get(sheet_url_b) == revision_b: return # 지난번 이후 바뀌지 않았으면 전체 읽기 생략
+        records_b = self.sheets.load_entries(sheet_url_b)
+        marker_b = self.sheets.get_last_checked(sheet_url_b)
+        with self._lock, self._conn:
+            self._conn.executemany("""INSERT INTO entries (sheet_url, date, emotion, gratitude, message, teacher_note, dirty) VALUES (?, ?, ?, ?, ?, ?, 0)
+                                      ON CONFLICT (sheet_url, date) DO UPDATE SET teacher_note = excluded.teacher_note,
+                                      emotion = CASE WHEN entries.dirty = 0 THEN excluded.emotion ELSE entries.emotion END,
+                                      gratitude = CASE WHEN entries.dirty = 0 THEN excluded.gratitude ELSE entries.gratitude END,
+                                      message = CASE WHEN entries.dirty = 0 THEN excluded.message ELSE entries.message END""",
+                                   [(sheet_url_b, r_b["날짜"], r_b["감정"], r_b["감사한 일"], r_b["하고 싶은 말"], r_b["선생님 쪽지"] or "")
+                                    for r_b in records_b if r_b.get("날짜")])
+            self._conn.execute("""INSERT INTO markers (sheet_url, last_checked, dirty) VALUES (?, ?, 0)
+                                  ON CONFLICT (sheet_url) DO UPDATE SET last_checked = excluded.last_checked WHERE markers.dirty = 0""",
+                               (sheet_url_b, marker_b))
+        self._pulled_urls.add(sheet_url_b)
+        self._pulled_revisions[sheet_url_b] = revision_b
+
+    def _push_changes(self):
+        # 보낸 변경은 시트 저장이 끝났다고 확인될 때까지 dirty로 둔다 (대기열에서 끝내 실패하면 다음 주기에 다시 보냄)
+        for url_b, date_b, emotion_b, gratitude_b, message_b, dirty_b, job_b in self._query(
+                "SELECT sheet_url, date, emotion, gratitude, message, dirty, push_job FROM entries WHERE dirty != 0"):
+            if job_b is not None:
+                state_b = self.sheets.write_status(job_b)[0]
+                if state_b == "pending": continue
+                if state_b == "done":
+                    self._execute("UPDATE entries SET dirty = 0, push_job = NULL WHERE sheet_url = ? AND date = ? AND dirty = ?", (url_b, date_b, dirty_b))
+                    continue
+                # "failed" 또는 결과를 모름(재시작 등) -> 다시 보낸다
+            job_b = self.sheets.upsert_entry(url_b, date_b, [date_b, emotion_b, gratitude_b, message_b])
+            if job_b is None: self._execute("UPDATE entries SET dirty = 0, push_job = NULL WHERE sheet_url = ? AND date = ? AND dirty = ?", (url_b, date_b, dirty_b))
+            else: self._execute("UPDATE entries SET push_job = ? WHERE sheet_url = ? AND date = ? AND dirty = ?", (job_b, url_b, date_b, dirty_b))
+        for url_b, last_checked_b, dirty_b in self._query("SELECT sheet_url, last_checked, dirty FROM markers WHERE dirty != 0"):
+            self.sheets.set_last_checked(url_b, last_checked_b)
+            self._execute("UPDATE markers SET dirty = 0 WHERE sheet_url = ? AND dirty = ?", (url_b, dirty_b))
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(SQLITE_SYNC_INTERVAL_SECONDS)
+            with getattr(self.sheets.client, "background_priority", contextlib.nullcontext)():
+                for step_b in [self._push_changes, self._pull_roster] + [
+                        (lambda u_b=u_b: self._pull_entries(u_b)) for u_b, seen_b in list(self._active_urls.items())
+                        if time.monotonic() - seen_b < SQLITE_SYNC_ACTIVE_SECONDS]:
+                    try: step_b()
+                    except Exception: pass # 다음 주기에 다시 시도
+
+@st.cache_resource
+def get_diary_storage_backend_v10(_client_gspread_backend, backend_name_v10):
+    sheets_backend_v10 = GoogleSheetsDiaryBackend_v10(_client_gspread_backend) if _client_gspread_backend else None
+    if backend_name_v10 == "sqlite": return SQLiteDiaryBackend_v10(DIARY_SQLITE_PATH, sheets_backend_v10)
+    return sheets_backend_v10
+
+def read_secret_v10(key_secret_v10, default_secret_v10=None):
+    try: return st.secrets.get(key_secret_v10, default_secret_v10)
+    except Exception: return default_secret_v10 # secrets 파일이 없는 경우
 
 # --- 세션 상태 초기화 ---
 default_session_states_s_app_v10 = { 
@@ -78,8 +1232,9 @@ default_session_states_s_app_v10 = {
     "student_sheet_url": None, "student_emotion": None, "student_gratitude": "", 
     "student_message": "", "student_selected_diary_date": None,
     "student_navigation_history": [], 
-    "student_all_entries_cache": None, 
     "student_new_notes_to_display": [], 
+    "student_pending_writes": {}, # 날짜 -> (저장 대기열 작업 ID, 제출한 값) (시트 저장 확인 전)
+    "student_unread_notes_poll": None, # 메뉴 새 쪽지 표시용 (확인 시각, 새 쪽지 수)
     "notes_check_outcome": None # "check_notes" 페이지 결과 상태: None, "NOTES_FOUND", "NO_NEW_NOTES", "ERROR"
 }
 for key_s_v10, val_s_v10 in default_session_states_s_app_v10.items():
@@ -115,275 +1270,490 @@ def student_logout_nav_v10():
         st.session_state[key_to_reset_nav_s_v10] = default_session_states_s_app_v10[key_to_reset_nav_s_v10]
     st.rerun()
 
+# --- 학생 일기 저장소 (날짜 색인) ---
+class StudentDiaryStore_v10:
+    """일기 날짜 색인(전체)과 읽어 온 행(일부)을 보관: 날짜 -> 시트 행 번호(O(1) 조회), 정렬된 날짜 목록.
+    처음에는 최근 기간만 읽고, 오래된 일기는 필요할 때 날짜 범위 단위로 읽어서 합친다 (add_rows)."""
+    def __init__(self, date_index_store=(), row_spans_store=(), rows_store=None):
+        rows_store = rows_store or {}
+        self.df = pd.DataFrame(list(rows_store.values()), columns=EXPECTED_STUDENT_SHEET_HEADER, index=list(rows_store.keys()))
+        self.df.sort_index(inplace=True) # 인덱스 = 시트 행 번호 (3행부터 데이터)
+        self._compact()
+        self.rows_by_date = {}
+        for row_no_store, date_store in date_index_store:
+            if date_store and date_store not in self.rows_by_date: self.rows_by_date[sys.intern(date_store)] = row_no_store
+        self.dates_sorted = sorted(self.rows_by_date)
+        self.loaded_rows = set() # 이미 읽은 시트 행 (내용이 비어 있던 행 포함)
+        for r0_store, r1_store in row_spans_store: self.loaded_rows.update(range(r0_store, r1_store + 1))
+        self._pending_row_seq = 0 # 아직 시트 행 번호를 모르는 새 일기(저장 대기 중)는 음수 임시 번호 사용
+        self._lock = threading.RLock() # 여러 세션이 같은 저장소를 공유하므로 변경은 잠금 안에서
+
+    def _compact(self):
+        # 공유 캐시 메모리 절약: 몇 가지 값만 반복되는 감정 열은 category, 날짜 문자열은 intern (여러 학생이 같은 날짜 객체 공유)
+        self.df["감정"] = self.df["감정"].astype("category")
+        self.df["날짜"] = pd.Series([sys.intern(d_store) if isinstance(d_store, str) else d_store for d_store in self.df["날짜"]], index=self.df.index, dtype=object)
+
+    def approx_bytes(self):
+        with self._lock:
+            return int(self.df.memory_usage(deep=True).sum()) + 100 * len(self.rows_by_date) + 40 * len(self.loaded_rows)
+
+    @property
+    def empty(self): return not self.rows_by_date
+
+    def get(self, date_store):
+        # 아직 읽지 않은 범위의 날짜는 None (ensure_student_entries_range_v10로 먼저 읽는다)
+        with self._lock:
+            row_no_store = self.rows_by_date.get(date_store)
+            if row_no_store is None or row_no_store not in self.df.index: return None
+            rec_store = self.df.loc[row_no_store].to_dict()
+        if pd.isna(rec_store["감정"]): rec_store["감정"] = None # category 열의 빈 값(NaN)은 원래처럼 None으로
+        return rec_store
+
+    def dates_between(self, date_from_store, date_to_store):
+        """[date_from, date_to] 안의 날짜 (오름차순, 'YYYY-MM-DD' 문자열 비교)."""
+        return self.dates_sorted[bisect.bisect_left(self.dates_sorted, date_from_store):bisect.bisect_right(self.dates_sorted, date_to_store)]
+
+    def missing_row_spans(self, date_from_store, date_to_store):
+        with self._lock:
+            rows_store = [self.rows_by_date[d_store] for d_store in self.dates_between(date_from_store, date_to_store)]
+            return merge_row_spans_v10([r_store for r_store in rows_store if r_store > 0 and r_store not in self.loaded_rows])
+
+    def add_rows(self, row_spans_store, rows_store):
+        """범위로 읽어 온 행을 합친다 (이미 있는 행은 세션에서 고친 내용을 유지).
+        읽어 온 행의 날짜가 색인의 날짜와 다르면(색인을 만든 뒤 행 삽입/삭제/정렬) 아무것도 합치지 않고 False - 처음부터 다시 읽어야 한다."""
+        with self._lock:
+            dates_by_row_store = {row_store: date_store for date_store, row_store in self.rows_by_date.items() if row_store > 0}
+            for r0_store, r1_store in row_spans_store:
+                for r_store in range(r0_store, r1_store + 1):
+                    expected_store = dates_by_row_store.get(r_store)
+                    if expected_store is not None and str((rows_store.get(r_store) or {}).get("날짜") or "").strip() != str(expected_store).strip(): return False
+            new_rows_store = {r_store: rec_store for r_store, rec_store in rows_store.items() if r_store not in self.df.index}
+            for r0_store, r1_store in row_spans_store: self.loaded_rows.update(range(r0_store, r1_store + 1))
+            if not new_rows_store: return True
+            add_df_store = pd.DataFrame(list(new_rows_store.values()), columns=EXPECTED_STUDENT_SHEET_HEADER, index=list(new_rows_store.keys()))
+            self.df = pd.concat([self.df.astype({"감정": object}), add_df_store]).sort_index()
+            self._compact()
+            return True
+
+    def upsert(self, date_store, row_values_store, sheet_row_store=None):
+        """제출한 한 행 반영: 이미 있는 행이면 앞쪽 열만 갱신, 아니면 새 행 추가."""
+        date_store = sys.intern(date_store)
+        with self._lock:
+            if sheet_row_store is None: sheet_row_store = self.rows_by_date.get(date_store)
+            if sheet_row_store is None:
+                self._pending_row_seq -= 1; sheet_row_store = self._pending_row_seq
+            emotion_store = row_values_store[1] if len(row_values_store) > 1 else None
+            if emotion_store is not None and emotion_store not in self.df["감정"].cat.categories:
+                self.df["감정"] = self.df["감정"].cat.add_categories([emotion_store])
+            if sheet_row_store in self.df.index:
+                self.df.loc[sheet_row_store, EXPECTED_STUDENT_SHEET_HEADER[:len(row_values_store)]] = row_values_store
+            else:
+                self.df.loc[sheet_row_store] = list(row_values_store) + [""] * (len(EXPECTED_STUDENT_SHEET_HEADER) - len(row_values_store))
+                self._compact() # 행을 늘리면 category 열이 일반 열로 바뀔 수 있다
+            if date_store not in self.rows_by_date:
+                bisect.insort(self.dates_sorted, date_store)
+            self.rows_by_date[date_store] = sheet_row_store
+
+    def confirm_row(self, date_store, sheet_row_store):
+        # 저장 완료 후 임시 번호를 실제 시트 행 번호로 교체
+        with self._lock:
+            current_row_store = self.rows_by_date.get(date_store)
+            if current_row_store is None or not sheet_row_store or current_row_store >= 0 or sheet_row_store in self.df.index: return
+            self.df.rename(index={current_row_store: sheet_row_store}, inplace=True)
+            self.rows_by_date[date_store] = sheet_row_store
+            self.loaded_rows.add(sheet_row_store)
+
+    def merge_date_note_columns(self, date_index_store, notes_store):
+        """시트에서 다시 읽은 날짜(A)/쪽지(E) 열 반영: 새 날짜는 색인에 추가, 저장 대기 중이던 행은 행 번호 확정, 읽어 둔 행은 쪽지 갱신.
+        이미 아는 행의 날짜가 달라졌으면(행 삭제/정렬) 아무것도 바꾸지 않고 False - 처음부터 다시 읽어야 한다."""
+        with self._lock:
+            dates_by_row_store = dict(date_index_store)
+            if any(row_store > 0 and dates_by_row_store.get(row_store) != date_store for date_store, row_store in self.rows_by_date.items()): return False
+            for row_store, date_store in date_index_store:
+                if not date_store: continue
+                current_row_store = self.rows_by_date.get(date_store)
+                if current_row_store is None:
+                    date_store = sys.intern(date_store); self.rows_by_date[date_store] = row_store
+                    bisect.insort(self.dates_sorted, date_store)
+                elif current_row_store < 0: self.confirm_row(date_store, row_store) # 다른 세션/이전 실행의 제출이 시트에 저장됨
+            notes_by_row_store = pd.Series(notes_store, index=[row_store for row_store, _ in date_index_store], dtype=object)
+            known_rows_store = self.df.index.intersection(notes_by_row_store.index)
+            if len(known_rows_store): self.df.loc[known_rows_store, "선생님 쪽지"] = notes_by_row_store.loc[known_rows_store].values
+            return True
+
+    def apply_teacher_notes(self, notes_store):
+        # 쪽지 확인으로 알게 된 새 쪽지를 이미 읽어 둔 행에 반영 (지난 일기 보기에 바로 보이도록)
+        with self._lock:
+            for date_store, note_store in notes_store:
+                row_no_store = self.rows_by_date.get(date_store)
+                if row_no_store is not None and row_no_store in self.df.index: self.df.loc[row_no_store, "선생님 쪽지"] = note_store
+
 # --- 학생 데이터 로드 및 캐시 함수 ---
-def load_student_all_entries_cached_v10(g_client_s_app_v10, sheet_url_s_app_v10):
-    if isinstance(st.session_state.student_all_entries_cache, pd.DataFrame):
-        return st.session_state.student_all_entries_cache
-    try:
-        with st.spinner("학생 일기 데이터 로딩 중... (API 호출)"):
-            ws_s_load_app_v10 = g_client_s_app_v10.open_by_url(sheet_url_s_app_v10).sheet1
-            ensure_sheet_structure_s_app_v10(ws_s_load_app_v10, SETTINGS_ROW_DEFAULT, EXPECTED_STUDENT_SHEET_HEADER)
-            records_s_load_app_v10 = get_records_from_row2_header_s_app_v10(ws_s_load_app_v10, EXPECTED_STUDENT_SHEET_HEADER)
-            df_s_load_app_v10 = pd.DataFrame(records_s_load_app_v10)
-            st.session_state.student_all_entries_cache = df_s_load_app_v10
-            return df_s_load_app_v10
-    except Exception as e_load_s_app_v10:
-        st.error(f"학생 일기 데이터 로드 오류: {e_load_s_app_v10}"); return pd.DataFrame()
+def load_student_all_entries_cached_v10(diary_backend_s_app_v10, sheet_url_s_app_v10):
+    """세션마다 따로 들고 있지 않고 공유 캐시(get_shared_diary_cache_v10)의 저장소를 읽는다 - 다른 기기/재접속도 다시 받지 않음.
+    TTL이 지났으면 시트 변경 표식부터 확인해, 바뀐 경우에만 바뀐 부분을 읽는다."""
+    diary_cache_s_app_v10 = get_shared_diary_cache_v10()
+    store_s_load_app_v10 = diary_cache_s_app_v10.get(sheet_url_s_app_v10)
+    if store_s_load_app_v10 is not None:
+        get_app_metrics_v10().record_cache("shared_diary", "hit"); return store_s_load_app_v10
+    # 날짜 색인 전체 + 최근 기간만 읽는다 (오래된 일기는 ensure_student_entries_range_v10로 필요할 때)
+    since_s_load_app_v10 = (datetime.today() - timedelta(days=DIARY_RECENT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+    try: revalidated_s_load_app_v10 = revalidate_shared_diary_v10(diary_backend_s_app_v10, diary_cache_s_app_v10, sheet_url_s_app_v10, since_s_load_app_v10)
+    except Exception: revalidated_s_load_app_v10 = None # 확인에 실패하면 처음부터 다시 읽는다
+    get_app_metrics_v10().record_cache("shared_diary", revalidated_s_load_app_v10[0] if revalidated_s_load_app_v10 else "miss")
+    if revalidated_s_load_app_v10 is not None:
+        store_s_load_app_v10 = revalidated_s_load_app_v10[1]
+    else:
+        try:
+            with st.spinner("학생 일기 데이터 로딩 중... (API 호출)"):
+                store_s_load_app_v10 = StudentDiaryStore_v10(*diary_backend_s_app_v10.load_entries_window(sheet_url_s_app_v10, since_s_load_app_v10))
+        except Exception as e_load_s_app_v10:
+            st.error(f"학생 일기 데이터 로드 오류: {e_load_s_app_v10}"); return StudentDiaryStore_v10()
+        diary_cache_s_app_v10.put(sheet_url_s_app_v10, store_s_load_app_v10) # 표식 없이 넣으면 첫 만료 때 날짜/쪽지 열만 읽어 확인
+    # 캐시에서 빠진 뒤 다시 읽었거나 시트에서 바뀐 부분을 반영했으면, 이 세션의 저장 대기 중인 제출(아직 시트에 없음)을 다시 반영
+    for date_pending_v10, (_, values_pending_v10) in st.session_state.student_pending_writes.items():
+        store_s_load_app_v10.upsert(date_pending_v10, values_pending_v10)
+    return store_s_load_app_v10
 
-# --- MAIN STUDENT APP ---
-g_client_student_main_v10 = authorize_gspread_student_final_v10()
-students_df_login_v10 = get_students_df_for_student_app_v10(g_client_student_main_v10)
+def ensure_student_entries_range_v10(diary_backend_range_v10, sheet_url_range_v10, store_range_v10, date_from_range_v10, date_to_range_v10):
+    """날짜 범위의 일기 중 아직 읽지 않은 행만 A1 범위 읽기(batch_get 한 번)로 가져와 공유 캐시의 저장소에 합친다.
+    시트의 행이 그 사이 옮겨졌으면(읽은 행의 날짜가 색인과 다름) 공유 캐시 항목을 버리고 다시 실행해 처음부터 읽는다."""
+    spans_range_v10 = store_range_v10.missing_row_spans(date_from_range_v10, date_to_range_v10)
+    get_app_metrics_v10().record_cache("diary_window", "miss" if spans_range_v10 else "hit")
+    if not spans_range_v10: return
+    if not store_range_v10.add_rows(spans_range_v10, diary_backend_range_v10.load_entry_rows(sheet_url_range_v10, spans_range_v10)):
+        get_shared_diary_cache_v10().invalidate(sheet_url_range_v10)
+        st.rerun()
+    get_shared_diary_cache_v10().resize(sheet_url_range_v10)
+
+def patch_student_entries_cache_v10(sheet_url_patch_s, date_patch_s, row_values_patch_s, sheet_row_patch_s=None):
+    """제출한 한 행만 공유 캐시의 저장소에 반영 - 같은 시트를 보는 모든 세션에 바로 보인다 (시트 행 번호를 모르면 저장 완료 시 확정)."""
+    diary_cache_patch_v10 = get_shared_diary_cache_v10()
+    entry_patch_v10 = diary_cache_patch_v10.peek(sheet_url_patch_s)
+    if entry_patch_v10 is None: return
+    entry_patch_v10[0].upsert(date_patch_s, row_values_patch_s, sheet_row_patch_s)
+    diary_cache_patch_v10.resize(sheet_url_patch_s)
+
+def poll_unread_teacher_notes_v10(diary_backend_poll_v10, sheet_url_poll_v10):
+    """메뉴 표시용 새 쪽지 수. NOTES_POLL_INTERVAL_SECONDS 동안은 이전 결과를 쓰고, B1(확인 날짜)은 바꾸지 않는다."""
+    poll_v10 = st.session_state.student_unread_notes_poll
+    if poll_v10 is not None and time.monotonic() - poll_v10[0] < NOTES_POLL_INTERVAL_SECONDS: return poll_v10[1]
+    try: count_poll_v10 = len(diary_backend_poll_v10.find_new_notes(sheet_url_poll_v10)[1])
+    except Exception: return poll_v10[1] if poll_v10 is not None else 0 # 표시용이므로 실패하면 조용히 이전 값 사용
+    st.session_state.student_unread_notes_poll = (time.monotonic(), count_poll_v10)
+    return count_poll_v10
 
-if st.session_state.student_page == "login":
-    st.title("👧 감정 일기 로그인")
-    s_name_in_v10 = st.text_input("이름", key="s_login_name_vfinal_10")
-    s_pw_in_v10 = st.text_input("비밀번호 (6자리)", type="password", max_chars=6, key="s_login_pw_vfinal_10")
+@st.fragment(run_every=NOTES_POLL_INTERVAL_SECONDS)
+def unread_notes_menu_fragment_v10(diary_backend_poll_v10, sheet_url_poll_v10):
+    # 메뉴를 열어 둔 동안 주기적으로 이 버튼만 다시 그려 새 쪽지 수를 표시
+    unread_menu_v10 = poll_unread_teacher_notes_v10(diary_backend_poll_v10, sheet_url_poll_v10)
+    label_menu_v10 = f"새로운 선생님 쪽지 확인 🔴 {unread_menu_v10}" if unread_menu_v10 else "새로운 선생님 쪽지 확인"
+    if st.button(label_menu_v10, use_container_width=True, key="s_menu_notes_v10"):
+        student_go_to_page_nav_v10("check_notes", notes_check_outcome=None, student_new_notes_to_display=[])
 
-    if st.button("로그인", key="s_login_btn_vfinal_10"):
-        s_name_login_v10, s_pw_login_v10 = s_name_in_v10.strip(), s_pw_in_v10.strip()
-        if not s_name_login_v10 or not s_pw_login_v10: st.warning("이름과 비밀번호를 모두 입력하세요.")
+def sync_pending_diary_writes_v10(diary_backend_sync_v10):
+    """저장 대기 중인 제출의 결과를 확인해 세션에 반영 (완료: 행 번호 확정, 실패: 오류 표시 후 다시 로드)."""
+    pending_sync_v10 = st.session_state.student_pending_writes
+    if not pending_sync_v10: return
+    diary_cache_sync_v10 = get_shared_diary_cache_v10()
+    for date_sync_v10, (job_id_sync_v10, _) in list(pending_sync_v10.items()):
+        state_sync_v10, row_sync_v10, error_sync_v10 = diary_backend_sync_v10.write_status(job_id_sync_v10)
+        if state_sync_v10 == "pending": continue
+        del pending_sync_v10[date_sync_v10]
+        if state_sync_v10 == "failed":
+            st.error(f"일기 저장 오류 ({date_sync_v10}): {error_sync_v10}. 다시 작성해주세요.")
+            diary_cache_sync_v10.invalidate(st.session_state.student_sheet_url) # 시트에 실제로 저장된 내용으로 다시 로드
         else:
-            if students_df_login_v10.empty and g_client_student_main_v10:
-                 st.error("'학생목록' 시트가 비었거나 접근할 수 없습니다. 관리자에게 문의하세요.")
-            elif students_df_login_v10.empty and not g_client_student_main_v10: 
-                 st.error("Google API 인증에 실패했습니다. secrets 설정을 확인하거나 관리자에게 문의하세요.")
+            entry_sync_v10 = diary_cache_sync_v10.peek(st.session_state.student_sheet_url)
+            if entry_sync_v10 is not None and row_sync_v10: entry_sync_v10[0].confirm_row(date_sync_v10, row_sync_v10)
+            st.toast(f"✅ {date_sync_v10} 일기가 저장되었어요.")
+
+# --- MAIN STUDENT APP ---
+app_metrics_v10 = get_app_metrics_v10()
+# rerun 한 번 전체를 계측 (st.rerun()/st.stop()으로 중간에 끝나도 기록됨)
+with app_metrics_v10.rerun(st.session_state.student_page) as rerun_v10:
+    with rerun_v10.phase("auth"):
+        diary_backend_name_v10 = str(read_secret_v10("DIARY_STORAGE_BACKEND", "gsheets")).lower()
+        # sqlite 백엔드는 Google 인증 정보가 없으면 오프라인으로 동작
+        if diary_backend_name_v10 == "sqlite" and read_secret_v10("GOOGLE_CREDENTIALS") is None: g_client_student_main_v10 = None
+        else: g_client_student_main_v10 = get_scheduled_sheets_client_v10(authorize_gspread_student_final_v10())
+        diary_backend_main_v10 = get_diary_storage_backend_v10(g_client_student_main_v10, diary_backend_name_v10)
+
+    # 반 전체 미리 불러오기 - 시트 백엔드에서 PREFETCH_ON_STARTUP 또는 PREFETCH_SCHEDULE이 설정된 경우만
+    class_prefetch_job_v10 = None
+    prefetch_schedule_v10 = str(read_secret_v10("PREFETCH_SCHEDULE", "") or "")
+    prefetch_on_startup_v10 = str(read_secret_v10("PREFETCH_ON_STARTUP", "")).lower() in ("1", "true", "yes")
+    if diary_backend_main_v10 is not None and diary_backend_main_v10.prefetch_worthwhile and (prefetch_on_startup_v10 or prefetch_schedule_v10):
+        with rerun_v10.phase("prefetch"):
+            class_prefetch_job_v10 = get_class_prefetch_job_v10(diary_backend_main_v10, StudentDiaryStore_v10, prefetch_schedule_v10)
+            if prefetch_on_startup_v10 and class_prefetch_job_v10.progress["state"] == "idle":
+                roster_df_prefetch_v10 = get_students_df_for_student_app_v10(g_client_student_main_v10)
+                if not roster_df_prefetch_v10.empty: class_prefetch_job_v10.start(roster_df_prefetch_v10["시트URL"].tolist())
+
+    if st.session_state.student_page == "login":
+        st.title("👧 감정 일기 로그인")
+        s_name_in_v10 = st.text_input("이름", key="s_login_name_vfinal_10")
+        s_pw_in_v10 = st.text_input("비밀번호 (6자리)", type="password", max_chars=6, key="s_login_pw_vfinal_10")
+
+        if st.button("로그인", key="s_login_btn_vfinal_10"):
+            s_name_login_v10, s_pw_login_v10 = s_name_in_v10.strip(), s_pw_in_v10.strip()
+            if not s_name_login_v10 or not s_pw_login_v10: st.warning("이름과 비밀번호를 모두 입력하세요.")
             else:
-                s_record_v10 = students_df_login_v10[students_df_login_v10["이름"] == s_name_login_v10]
-                if not s_record_v10.empty and str(s_record_v10.iloc[0]["비밀번호"]).strip() == s_pw_login_v10:
-                    for key_s_reset_v10, val_s_reset_v10 in default_session_states_s_app_v10.items():
-                        st.session_state[key_s_reset_v10] = val_s_reset_v10
-                    st.session_state.student_logged_in = True
-                    st.session_state.student_name = s_name_login_v10
-                    st.session_state.student_sheet_url = s_record_v10.iloc[0]["시트URL"]
-                    # 로그인 후 'check_notes'로 이동하면서 관련 상태 초기화
-                    student_go_to_page_nav_v10("check_notes", 
-                                              notes_check_outcome=None, 
-                                              student_new_notes_to_display=[])
-                else: st.error("이름 또는 비밀번호가 틀립니다.")
-
-elif st.session_state.student_logged_in:
-    df_student_entries_main_v10 = load_student_all_entries_cached_v10(g_client_student_main_v10, st.session_state.student_sheet_url)
-
-    if st.session_state.student_page == "check_notes":
-        st.title(f"📬 {st.session_state.student_name}님, 선생님 쪽지 확인")
-        
-        # 버튼 클릭 전 초기 안내 메시지
-        if st.session_state.notes_check_outcome is None:
-            st.info("아래 '새로운 선생님 쪽지 확인하기 🔍' 버튼을 눌러 새 쪽지가 있는지 확인해보세요.")
+                if diary_backend_main_v10 is None:
+                     st.error("Google API 인증에 실패했습니다. secrets 설정을 확인하거나 관리자에게 문의하세요.")
+                else:
+                    with rerun_v10.phase("roster"):
+                        roster_ok_v10 = diary_backend_main_v10.roster_available()
+                        s_record_v10 = diary_backend_main_v10.lookup_student(s_name_login_v10) if roster_ok_v10 else None
+                    if not roster_ok_v10: st.error("'학생목록' 시트가 비었거나 접근할 수 없습니다. 관리자에게 문의하세요.")
+                    elif s_record_v10 is not None and hmac.compare_digest(s_record_v10[0], hash_student_password_v10(s_pw_login_v10)):
+                        for key_s_reset_v10, val_s_reset_v10 in default_session_states_s_app_v10.items():
+                            st.session_state[key_s_reset_v10] = val_s_reset_v10
+                        st.session_state.student_logged_in = True
+                        st.session_state.student_name = s_name_login_v10
+                        st.session_state.student_sheet_url = s_record_v10[1]
+                        # 로그인 후 'check_notes'로 이동하면서 관련 상태 초기화
+                        student_go_to_page_nav_v10("check_notes", 
+                                                  notes_check_outcome=None, 
+                                                  student_new_notes_to_display=[])
+                    else: st.error("이름 또는 비밀번호가 틀립니다.")
 
-        if st.button("새로운 선생님 쪽지 확인하기 🔍", key="s_check_new_notes_btn_vfinal_10"):
-            new_notes_this_check_v10 = [] 
-            with st.spinner("새로운 쪽지를 확인하는 중입니다... (API 호출 중)"):
-                try:
-                    student_sheet_url_notes_v10 = st.session_state.student_sheet_url
-                    if not student_sheet_url_notes_v10:
-                        st.error("학생 시트 정보를 찾을 수 없습니다."); st.stop()
+    elif st.session_state.student_logged_in:
+        with rerun_v10.phase("diary_load"):
+            sync_pending_diary_writes_v10(diary_backend_main_v10)
+            diary_store_main_v10 = load_student_all_entries_cached_v10(diary_backend_main_v10, st.session_state.student_sheet_url)
 
-                    ws_notes_v10 = g_client_student_main_v10.open_by_url(student_sheet_url_notes_v10).sheet1
-                    ensure_sheet_structure_s_app_v10(ws_notes_v10, SETTINGS_ROW_DEFAULT, EXPECTED_STUDENT_SHEET_HEADER)
-                    
-                    last_checked_date_str_v10 = "2000-01-01"
+        if st.session_state.student_page == "check_notes":
+            st.title(f"📬 {st.session_state.student_name}님, 선생님 쪽지 확인")
+        
+            # 버튼 클릭 전 초기 안내 메시지
+            if st.session_state.notes_check_outcome is None:
+                st.info("아래 '새로운 선생님 쪽지 확인하기 🔍' 버튼을 눌러 새 쪽지가 있는지 확인해보세요.")
+
+            if st.button("새로운 선생님 쪽지 확인하기 🔍", key="s_check_new_notes_btn_vfinal_10"):
+                new_notes_this_check_v10 = [] 
+                with st.spinner("새로운 쪽지를 확인하는 중입니다... (API 호출 중)"):
                     try:
-                        b1_val_v10 = ws_notes_v10.cell(1, 2).value
-                        if b1_val_v10: last_checked_date_str_v10 = b1_val_v10
-                    except Exception: pass 
-                    
-                    if not df_student_entries_main_v10.empty:
-                        try: last_checked_dt_v10 = datetime.strptime(last_checked_date_str_v10, "%Y-%m-%d").date()
-                        except ValueError: last_checked_dt_v10 = datetime.strptime("2000-01-01", "%Y-%m-%d").date()
-
-                        for _, row_n_v10 in df_student_entries_main_v10.iterrows():
-                            date_n_v10, note_n_v10 = row_n_v10.get("날짜"), str(row_n_v10.get("선생님 쪽지", "")).strip()
-                            if note_n_v10 and date_n_v10:
-                                try:
-                                    if datetime.strptime(date_n_v10, "%Y-%m-%d").date() > last_checked_dt_v10:
-                                        new_notes_this_check_v10.append((date_n_v10, note_n_v10))
-                                except ValueError: continue                         
+                        student_sheet_url_notes_v10 = st.session_state.student_sheet_url
+                        if not student_sheet_url_notes_v10:
+                            st.error("학생 시트 정보를 찾을 수 없습니다."); st.stop()
+
+                        if not diary_store_main_v10.empty:
+                            # B1과 날짜/쪽지 열만 읽어서 마지막 확인 이후의 쪽지를 찾는다
+                            _, new_notes_this_check_v10 = diary_backend_main_v10.find_new_notes(student_sheet_url_notes_v10)
+                            diary_store_main_v10.apply_teacher_notes(new_notes_this_check_v10)
                         
-                        update_b1_date_v10 = datetime.today().strftime("%Y-%m-%d")
-                        if new_notes_this_check_v10: update_b1_date_v10 = new_notes_this_check_v10[-1][0]
+                            update_b1_date_v10 = datetime.today().strftime("%Y-%m-%d")
+                            if new_notes_this_check_v10: update_b1_date_v10 = new_notes_this_check_v10[-1][0]
                         
-                        try: ws_notes_v10.update_cell(1, 2, update_b1_date_v10)
-                        except Exception as e_b1: st.warning(f"확인 날짜 업데이트 실패: {e_b1}")
-                    else: st.warning("일기 데이터가 없습니다.")
-
-                    if new_notes_this_check_v10:
-                        st.session_state.student_new_notes_to_display = sorted(new_notes_this_check_v10, key=lambda x: x[0])
-                        st.session_state.notes_check_outcome = "NOTES_FOUND"
-                    else:
-                        st.session_state.student_new_notes_to_display = []
-                        st.session_state.notes_check_outcome = "NO_NEW_NOTES"
-                except Exception as e_notes: 
-                    st.error(f"쪽지 확인 오류: {e_notes}")
-                    st.session_state.notes_check_outcome = "ERROR"
-            # 버튼 클릭 후에는 항상 rerun을 하여 변경된 session_state.notes_check_outcome을 바탕으로 아래 표시 로직이 실행되도록 함
-            st.rerun() 
-
-        # --- 쪽지 확인 결과 표시 ---
-        # 이 부분은 st.button()의 if 블록 바깥에 있어야 rerun 후에 올바르게 표시됨
-        if st.session_state.notes_check_outcome == "NOTES_FOUND":
-            st.success(f"새로운 쪽지가 {len(st.session_state.student_new_notes_to_display)}개 도착했어요!")
-            for date_d_v10, note_d_v10 in st.session_state.student_new_notes_to_display:
-                st.markdown(f"**{date_d_v10}**: {note_d_v10}")
-        elif st.session_state.notes_check_outcome == "NO_NEW_NOTES":
-            st.info("새로운 선생님 쪽지가 없습니다.")
-        elif st.session_state.notes_check_outcome == "ERROR":
-            st.warning("쪽지를 확인하는 중 오류가 발생했습니다. 다시 시도해주세요.")
-        # notes_check_outcome이 None일 경우 (초기 상태)는 페이지 상단의 st.info 안내 메시지가 표시됨
+                            try:
+                                diary_backend_main_v10.set_last_checked(student_sheet_url_notes_v10, update_b1_date_v10)
+                                st.session_state.student_unread_notes_poll = (time.monotonic(), 0) # 메뉴의 새 쪽지 표시도 비운다
+                            except Exception as e_b1: st.warning(f"확인 날짜 업데이트 실패: {e_b1}")
+                        else: st.warning("일기 데이터가 없습니다.")
+
+                        if new_notes_this_check_v10:
+                            st.session_state.student_new_notes_to_display = sorted(new_notes_this_check_v10, key=lambda x: x[0])
+                            st.session_state.notes_check_outcome = "NOTES_FOUND"
+                        else:
+                            st.session_state.student_new_notes_to_display = []
+                            st.session_state.notes_check_outcome = "NO_NEW_NOTES"
+                    except Exception as e_notes: 
+                        st.error(f"쪽지 확인 오류: {e_notes}")
+                        st.session_state.notes_check_outcome = "ERROR"
+                # 버튼 클릭 후에는 항상 rerun을 하여 변경된 session_state.notes_check_outcome을 바탕으로 아래 표시 로직이 실행되도록 함
+                st.rerun() 
+
+            # --- 쪽지 확인 결과 표시 ---
+            # 이 부분은 st.button()의 if 블록 바깥에 있어야 rerun 후에 올바르게 표시됨
+            if st.session_state.notes_check_outcome == "NOTES_FOUND":
+                st.success(f"새로운 쪽지가 {len(st.session_state.student_new_notes_to_display)}개 도착했어요!")
+                for date_d_v10, note_d_v10 in st.session_state.student_new_notes_to_display:
+                    st.markdown(f"**{date_d_v10}**: {note_d_v10}")
+            elif st.session_state.notes_check_outcome == "NO_NEW_NOTES":
+                st.info("새로운 선생님 쪽지가 없습니다.")
+            elif st.session_state.notes_check_outcome == "ERROR":
+                st.warning("쪽지를 확인하는 중 오류가 발생했습니다. 다시 시도해주세요.")
+            # notes_check_outcome이 None일 경우 (초기 상태)는 페이지 상단의 st.info 안내 메시지가 표시됨
         
-        st.divider()
-        s_notes_cols1_v10, s_notes_cols2_v10 = st.columns(2)
-        with s_notes_cols1_v10:
-            if st.button("메인 메뉴", key="s_notes_to_menu_vfinal_10", use_container_width=True):
-                student_go_to_page_nav_v10("menu", notes_check_outcome=None, student_new_notes_to_display=[])
-        with s_notes_cols2_v10:
-            if st.button("로그아웃", key="s_logout_notes_vfinal_10", use_container_width=True): student_logout_nav_v10()
-
-    elif st.session_state.student_page == "menu":
-        st.title(f"📘 {st.session_state.student_name}님 감정일기"); st.divider()
-        if st.button("✏️ 오늘 일기 쓰기/수정", type="primary", use_container_width=True, key="s_menu_write_v10"):
-            today_s_menu_v10 = datetime.today().strftime("%Y-%m-%d")
-            st.session_state.student_emotion, st.session_state.student_gratitude, st.session_state.student_message = None, "", ""
-            if not df_student_entries_main_v10.empty:
-                today_entry_menu_v10 = df_student_entries_main_v10[df_student_entries_main_v10["날짜"] == today_s_menu_v10]
-                if not today_entry_menu_v10.empty:
-                    r_menu_v10 = today_entry_menu_v10.iloc[0]
+            st.divider()
+            s_notes_cols1_v10, s_notes_cols2_v10 = st.columns(2)
+            with s_notes_cols1_v10:
+                if st.button("메인 메뉴", key="s_notes_to_menu_vfinal_10", use_container_width=True):
+                    student_go_to_page_nav_v10("menu", notes_check_outcome=None, student_new_notes_to_display=[])
+            with s_notes_cols2_v10:
+                if st.button("로그아웃", key="s_logout_notes_vfinal_10", use_container_width=True): student_logout_nav_v10()
+
+        elif st.session_state.student_page == "menu":
+            st.title(f"📘 {st.session_state.student_name}님 감정일기"); st.divider()
+            if st.button("✏️ 오늘 일기 쓰기/수정", type="primary", use_container_width=True, key="s_menu_write_v10"):
+                today_s_menu_v10 = datetime.today().strftime("%Y-%m-%d")
+                st.session_state.student_emotion, st.session_state.student_gratitude, st.session_state.student_message = None, "", ""
+                r_menu_v10 = diary_store_main_v10.get(today_s_menu_v10)
+                if r_menu_v10 is not None:
                     st.session_state.student_emotion = r_menu_v10.get("감정")
                     st.session_state.student_gratitude = r_menu_v10.get("감사한 일", "")
                     st.session_state.student_message = r_menu_v10.get("하고 싶은 말", "")
-            student_go_to_page_nav_v10("write_emotion")
+                student_go_to_page_nav_v10("write_emotion")
         
-        # ★★★ 메뉴명 변경 완료 ★★★
-        if st.button("지난 일기 보기", use_container_width=True, key="s_menu_view_v10_renamed"):
-            student_go_to_page_nav_v10("view_diary_only", student_selected_diary_date=None) 
+            # ★★★ 메뉴명 변경 완료 ★★★
+            if st.button("지난 일기 보기", use_container_width=True, key="s_menu_view_v10_renamed"):
+                student_go_to_page_nav_v10("view_diary_only", student_selected_diary_date=None) 
 
-        if st.button("새로운 선생님 쪽지 확인", use_container_width=True, key="s_menu_notes_v10"):
-            student_go_to_page_nav_v10("check_notes", notes_check_outcome=None, student_new_notes_to_display=[])
-        if st.button("로그아웃", use_container_width=True, key="s_logout_menu_v10"): student_logout_nav_v10()
+            unread_notes_menu_fragment_v10(diary_backend_main_v10, st.session_state.student_sheet_url)
+            if st.button("로그아웃", use_container_width=True, key="s_logout_menu_v10"): student_logout_nav_v10()
     
-    elif st.session_state.student_page == "write_emotion":
-        st.title("😊 오늘의 감정"); st.caption("오늘 어떤 감정을 느꼈나요?")
-        emo_dict_s_v10 = { "😀 긍정": ["기쁨", "감사", "자신감", "설렘", "평온"], "😐 보통": ["그냥 그래요", "지루함", "무난함"], "😢 부정": ["슬픔", "불안", "짜증", "화남", "피곤"] }
-        cur_g_v10, cur_d_v10 = None, None
-        if st.session_state.student_emotion:
-            try: 
-                g_v10, d_v10 = st.session_state.student_emotion.split(" - ",1)
-                if g_v10 in emo_dict_s_v10 and d_v10 in emo_dict_s_v10[g_v10]: cur_g_v10, cur_d_v10 = g_v10, d_v10
-            except ValueError: pass
-        sel_g_v10 = st.selectbox("감정 그룹", list(emo_dict_s_v10.keys()), index=list(emo_dict_s_v10.keys()).index(cur_g_v10) if cur_g_v10 else 0, key="s_emo_g_vfinal_10")
-        sel_d_v10 = st.selectbox("구체적 감정", emo_dict_s_v10[sel_g_v10], index=emo_dict_s_v10[sel_g_v10].index(cur_d_v10) if cur_d_v10 and cur_g_v10 == sel_g_v10 else 0, key="s_emo_d_vfinal_10")
-        st.session_state.student_emotion = f"{sel_g_v10} - {sel_d_v10}"
-        b1_we_v10,b2_we_v10 = st.columns(2)
-        with b1_we_v10:
-             if st.button("← 이전", key="s_emo_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
-        with b2_we_v10:
-            if st.button("다음 →", key="s_emo_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("write_gratitude")
-
-    elif st.session_state.student_page == "write_gratitude":
-        st.title("🙏 감사한 일"); st.caption("오늘 어떤 점이 감사했나요?")
-        st.session_state.student_gratitude = st.text_area("감사한 일", height=150, value=st.session_state.student_gratitude, key="s_grat_txt_vfinal_10", placeholder="사소한 것이라도 좋아요!")
-        b1_wg_v10,b2_wg_v10 = st.columns(2)
-        with b1_wg_v10:
-            if st.button("← 이전", key="s_grat_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
-        with b2_wg_v10:
-            if st.button("다음 →", key="s_grat_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("write_message")
-
-    elif st.session_state.student_page == "write_message":
-        st.title("💬 하고 싶은 말"); st.caption("선생님이나 친구, 또는 자신에게 하고 싶은 말을 자유롭게 적어보세요.")
-        st.session_state.student_message = st.text_area("하고 싶은 말", height=200, value=st.session_state.student_message, key="s_msg_txt_vfinal_10", placeholder="어떤 이야기든 괜찮아요.")
-        b1_wm_v10,b2_wm_v10 = st.columns(2)
-        with b1_wm_v10:
-            if st.button("← 이전", key="s_msg_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
-        with b2_wm_v10:
-            if st.button("다음 →", key="s_msg_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("confirm_submission")
-
-    elif st.session_state.student_page == "confirm_submission":
-        st.title("✅ 내용 확인"); st.divider()
-        st.write(f"**감정:** {st.session_state.student_emotion or '(선택 안 함)'}")
-        st.write(f"**감사한 일:** {st.session_state.student_gratitude or '(내용 없음)'}")
-        st.write(f"**하고 싶은 말:** {st.session_state.student_message or '(내용 없음)'}")
-        st.divider()
-        b1_cs_v10,b2_cs_v10 = st.columns(2)
-        with b1_cs_v10:
-            if st.button("← 수정하기", key="s_conf_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
-        with b2_cs_v10:
-            if st.button("✔️ 제출하기", key="s_submit_diary_vfinal_10", use_container_width=True, type="primary"):
-                today_submit_s_v10 = datetime.today().strftime("%Y-%m-%d")
-                try:
-                    with st.spinner("일기 저장 중..."):
-                        ws_s_submit_v10 = g_client_student_main_v10.open_by_url(st.session_state.student_sheet_url).sheet1
-                        all_records_at_submit_v10 = get_records_from_row2_header_s_app_v10(ws_s_submit_v10, EXPECTED_STUDENT_SHEET_HEADER)
-                        
-                        existing_idx_s_v10, note_today_s_v10 = -1, ""
-                        for idx_s_v10, r_s_submit_v10 in enumerate(all_records_at_submit_v10):
-                            if r_s_submit_v10.get("날짜") == today_submit_s_v10:
-                                existing_idx_s_v10, note_today_s_v10 = idx_s_v10, str(r_s_submit_v10.get("선생님 쪽지", "")); break
-                        
+        elif st.session_state.student_page == "write_emotion":
+            st.title("😊 오늘의 감정"); st.caption("오늘 어떤 감정을 느꼈나요?")
+            emo_dict_s_v10 = { "😀 긍정": ["기쁨", "감사", "자신감", "설렘", "평온"], "😐 보통": ["그냥 그래요", "지루함", "무난함"], "😢 부정": ["슬픔", "불안", "짜증", "화남", "피곤"] }
+            cur_g_v10, cur_d_v10 = None, None
+            if st.session_state.student_emotion:
+                try: 
+                    g_v10, d_v10 = st.session_state.student_emotion.split(" - ",1)
+                    if g_v10 in emo_dict_s_v10 and d_v10 in emo_dict_s_v10[g_v10]: cur_g_v10, cur_d_v10 = g_v10, d_v10
+                except ValueError: pass
+            sel_g_v10 = st.selectbox("감정 그룹", list(emo_dict_s_v10.keys()), index=list(emo_dict_s_v10.keys()).index(cur_g_v10) if cur_g_v10 else 0, key="s_emo_g_vfinal_10")
+            sel_d_v10 = st.selectbox("구체적 감정", emo_dict_s_v10[sel_g_v10], index=emo_dict_s_v10[sel_g_v10].index(cur_d_v10) if cur_d_v10 and cur_g_v10 == sel_g_v10 else 0, key="s_emo_d_vfinal_10")
+            st.session_state.student_emotion = f"{sel_g_v10} - {sel_d_v10}"
+            b1_we_v10,b2_we_v10 = st.columns(2)
+            with b1_we_v10:
+                 if st.button("← 이전", key="s_emo_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
+            with b2_we_v10:
+                if st.button("다음 →", key="s_emo_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("write_gratitude")
+
+        elif st.session_state.student_page == "write_gratitude":
+            st.title("🙏 감사한 일"); st.caption("오늘 어떤 점이 감사했나요?")
+            st.session_state.student_gratitude = st.text_area("감사한 일", height=150, value=st.session_state.student_gratitude, key="s_grat_txt_vfinal_10", placeholder="사소한 것이라도 좋아요!")
+            b1_wg_v10,b2_wg_v10 = st.columns(2)
+            with b1_wg_v10:
+                if st.button("← 이전", key="s_grat_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
+            with b2_wg_v10:
+                if st.button("다음 →", key="s_grat_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("write_message")
+
+        elif st.session_state.student_page == "write_message":
+            st.title("💬 하고 싶은 말"); st.caption("선생님이나 친구, 또는 자신에게 하고 싶은 말을 자유롭게 적어보세요.")
+            st.session_state.student_message = st.text_area("하고 싶은 말", height=200, value=st.session_state.student_message, key="s_msg_txt_vfinal_10", placeholder="어떤 이야기든 괜찮아요.")
+            b1_wm_v10,b2_wm_v10 = st.columns(2)
+            with b1_wm_v10:
+                if st.button("← 이전", key="s_msg_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
+            with b2_wm_v10:
+                if st.button("다음 →", key="s_msg_n_vfinal_10", use_container_width=True, type="primary"): student_go_to_page_nav_v10("confirm_submission")
+
+        elif st.session_state.student_page == "confirm_submission":
+            st.title("✅ 내용 확인"); st.divider()
+            st.write(f"**감정:** {st.session_state.student_emotion or '(선택 안 함)'}")
+            st.write(f"**감사한 일:** {st.session_state.student_gratitude or '(내용 없음)'}")
+            st.write(f"**하고 싶은 말:** {st.session_state.student_message or '(내용 없음)'}")
+            st.divider()
+            b1_cs_v10,b2_cs_v10 = st.columns(2)
+            with b1_cs_v10:
+                if st.button("← 수정하기", key="s_conf_b_vfinal_10", use_container_width=True): student_go_back_page_nav_v10()
+            with b2_cs_v10:
+                if st.button("✔️ 제출하기", key="s_submit_diary_vfinal_10", use_container_width=True, type="primary"):
+                    today_submit_s_v10 = datetime.today().strftime("%Y-%m-%d")
+                    try:
+                        # 선생님 쪽지(E열)는 쓰지 않는다 - 기존 쪽지를 다시 읽지 않고도 보존
                         new_data_s_v10 = [today_submit_s_v10, st.session_state.student_emotion,
-                                          st.session_state.student_gratitude, st.session_state.student_message, note_today_s_v10]
-                        
-                        if existing_idx_s_v10 != -1: 
-                            row_to_update_v10 = existing_idx_s_v10 + 3
-                            end_col_letter_upd_v10 = chr(ord('A') + len(EXPECTED_STUDENT_SHEET_HEADER) - 1)
-                            range_to_update_s_v10 = f'A{row_to_update_v10}:{end_col_letter_upd_v10}{row_to_update_v10}'
-                            ws_s_submit_v10.update(range_to_update_s_v10, [new_data_s_v10], value_input_option='USER_ENTERED')
-                            st.success("🔄 일기 수정 완료!")
-                        else: 
-                            ws_s_submit_v10.append_row(new_data_s_v10, value_input_option='USER_ENTERED')
-                            st.success("🌟 일기 저장 완료!")
-                        
-                        st.session_state.student_all_entries_cache = None 
+                                          st.session_state.student_gratitude, st.session_state.student_message]
+                        is_update_s_v10 = diary_store_main_v10.get(today_submit_s_v10) is not None
+                        # 바로 응답 - 시트 저장은 백그라운드에서 (저장 확인은 sync_pending_diary_writes_v10)
+                        job_id_s_v10 = diary_backend_main_v10.upsert_entry(st.session_state.student_sheet_url, today_submit_s_v10, new_data_s_v10)
+                        if job_id_s_v10: st.session_state.student_pending_writes[today_submit_s_v10] = (job_id_s_v10, new_data_s_v10)
+                        patch_student_entries_cache_v10(st.session_state.student_sheet_url, today_submit_s_v10, new_data_s_v10)
+                        if is_update_s_v10: st.success("🔄 일기 수정 완료!")
+                        else: st.success("🌟 일기 저장 완료!")
+                    
                         for k_form_s_v10 in ["student_emotion", "student_gratitude", "student_message"]: st.session_state[k_form_s_v10] = default_session_states_s_app_v10[k_form_s_v10]
                         st.session_state.student_selected_diary_date = today_submit_s_v10
                         st.session_state.student_navigation_history = [] 
                         st.balloons()
                         student_go_to_page_nav_v10("view_diary_only", notes_check_outcome=None, student_new_notes_to_display=[])
-                except Exception as e_s_v10: st.error(f"일기 저장 오류: {e_s_v10}")
+                    except Exception as e_s_v10: st.error(f"일기 저장 오류: {e_s_v10}")
 
-    # --- ★★★ 수정된 "지난 일기 보기" 페이지 (삭제 기능 없음) ★★★ ---
-    elif st.session_state.student_page == "view_diary_only": 
-        st.title("📖 지난 일기 보기"); st.divider() 
-        if df_student_entries_main_v10.empty: st.info("작성된 일기가 없습니다.")
-        else:
-            dates_s_view_v10 = sorted(list(set(df_student_entries_main_v10["날짜"].dropna())), reverse=True)
-            if not dates_s_view_v10: st.info("작성된 일기가 없습니다.")
+        # --- ★★★ 수정된 "지난 일기 보기" 페이지 (삭제 기능 없음) ★★★ ---
+        elif st.session_state.student_page == "view_diary_only": 
+            st.title("📖 지난 일기 보기"); st.divider() 
+            if diary_store_main_v10.empty: st.info("작성된 일기가 없습니다.")
             else:
-                def_date_s_view_v10 = st.session_state.get("student_selected_diary_date")
-                if not def_date_s_view_v10 or def_date_s_view_v10 not in dates_s_view_v10: 
-                    def_date_s_view_v10 = dates_s_view_v10[0] if dates_s_view_v10 else datetime.today().strftime("%Y-%m-%d")
+                # 기간을 고르면 그 기간의 일기만 시트에서 읽어 온다 (이미 읽은 기간은 다시 읽지 않음)
+                today_view_v10 = datetime.today().date()
+                # 날짜는 'YYYY-MM-DD' 문자열로 정렬되어 있으므로 처음과 끝만 파싱하면 된다 (rerun마다 전체를 파싱하지 않음)
+                valid_dates_view_v10 = [d_v10 for d_v10 in (parse_diary_date_v10(x_v10) for x_v10 in (diary_store_main_v10.dates_sorted[0], diary_store_main_v10.dates_sorted[-1])) if d_v10]
+                first_date_view_v10 = min(valid_dates_view_v10 + [today_view_v10])
+                last_date_view_v10 = max(valid_dates_view_v10 + [today_view_v10])
+                default_from_view_v10 = min(today_view_v10 - timedelta(days=DIARY_RECENT_WINDOW_DAYS), max(valid_dates_view_v10 or [today_view_v10]))
+                range_view_v10 = st.date_input("기간 선택:", value=(max(default_from_view_v10, first_date_view_v10), last_date_view_v10),
+                                               min_value=first_date_view_v10, max_value=last_date_view_v10, key="s_diary_range_vfinal_10")
+                range_view_v10 = tuple(range_view_v10) if isinstance(range_view_v10, (tuple, list)) else (range_view_v10,)
+                range_from_view_v10 = range_view_v10[0].strftime("%Y-%m-%d") if range_view_v10 else first_date_view_v10.strftime("%Y-%m-%d")
+                range_to_view_v10 = range_view_v10[-1].strftime("%Y-%m-%d") if range_view_v10 else last_date_view_v10.strftime("%Y-%m-%d")
+                try:
+                    with st.spinner("선택한 기간의 일기를 불러오는 중..."):
+                        ensure_student_entries_range_v10(diary_backend_main_v10, st.session_state.student_sheet_url, diary_store_main_v10, range_from_view_v10, range_to_view_v10)
+                except Exception as e_range_v10: st.error(f"일기 불러오기 오류: {e_range_v10}")
+                dates_s_view_v10 = diary_store_main_v10.dates_between(range_from_view_v10, range_to_view_v10)[::-1]
+                if not dates_s_view_v10: st.info("선택한 기간에 작성된 일기가 없습니다.")
+                else:
+                    def_date_s_view_v10 = st.session_state.get("student_selected_diary_date")
+                    if not def_date_s_view_v10 or def_date_s_view_v10 not in dates_s_view_v10: 
+                        def_date_s_view_v10 = dates_s_view_v10[0] if dates_s_view_v10 else datetime.today().strftime("%Y-%m-%d")
                 
-                sel_date_idx_v10 = dates_s_view_v10.index(def_date_s_view_v10) if def_date_s_view_v10 in dates_s_view_v10 else 0
+                    sel_date_idx_v10 = dates_s_view_v10.index(def_date_s_view_v10) if def_date_s_view_v10 in dates_s_view_v10 else 0
                 
-                sel_date_s_v10 = st.selectbox(
-                    "확인할 날짜 선택:", 
-                    options=dates_s_view_v10, 
-                    index=sel_date_idx_v10, 
-                    key="s_diary_sel_vfinal_10_view_only"
-                )
-                st.session_state.student_selected_diary_date = sel_date_s_v10
-
-                diary_s_v10 = df_student_entries_main_v10[df_student_entries_main_v10["날짜"] == sel_date_s_v10]
-                if not diary_s_v10.empty:
-                    r_s_view_v10 = diary_s_v10.iloc[0]
-                    st.subheader(f"🗓️ {sel_date_s_v10} 일기")
-                    st.write(f"**감정:** {r_s_view_v10.get('감정', '')}")
-                    st.write(f"**감사한 일:** {r_s_view_v10.get('감사한 일', '')}")
-                    st.write(f"**하고 싶은 말:** {r_s_view_v10.get('하고 싶은 말', '')}")
-                    st.write(f"**선생님 쪽지:** {str(r_s_view_v10.get('선생님 쪽지', ''))}")
+                    sel_date_s_v10 = st.selectbox(
+                        "확인할 날짜 선택:", 
+                        options=dates_s_view_v10, 
+                        index=sel_date_idx_v10, 
+                        key="s_diary_sel_vfinal_10_view_only"
+                    )
+                    st.session_state.student_selected_diary_date = sel_date_s_v10
+
+                    r_s_view_v10 = diary_store_main_v10.get(sel_date_s_v10)
+                    if r_s_view_v10 is not None:
+                        st.subheader(f"🗓️ {sel_date_s_v10} 일기")
+                        if sel_date_s_v10 in st.session_state.student_pending_writes:
+                            st.caption("⏳ 시트에 저장하는 중이에요. 잠시 후 자동으로 반영됩니다.")
+                        st.write(f"**감정:** {r_s_view_v10.get('감정', '')}")
+                        st.write(f"**감사한 일:** {r_s_view_v10.get('감사한 일', '')}")
+                        st.write(f"**하고 싶은 말:** {r_s_view_v10.get('하고 싶은 말', '')}")
+                        st.write(f"**선생님 쪽지:** {str(r_s_view_v10.get('선생님 쪽지', ''))}")
                     
-                    # --- 삭제 버튼 및 관련 로직 완전 제거 ---
+                        # --- 삭제 버튼 및 관련 로직 완전 제거 ---
                     
-                else: 
-                    if sel_date_s_v10: 
-                        st.info(f"{sel_date_s_v10}에 작성된 일기가 없습니다.")
+                    else: 
+                        if sel_date_s_v10: 
+                            st.info(f"{sel_date_s_v10}에 작성된 일기가 없습니다.")
         
-        st.divider()
-        s_view_cols1_v10_final, s_view_cols2_v10_final = st.columns(2)
-        with s_view_cols1_v10_final:
-            if st.button("뒤로가기", use_container_width=True, key="s_view_go_back_vfinal_10"): 
-                student_go_back_page_nav_v10() 
-        with s_view_cols2_v10_final:
-            if st.button("로그아웃", use_container_width=True, key="s_logout_view_vfinal_10"): 
-                student_logout_nav_v10()
-else: 
-    if st.session_state.student_page != "login": student_logout_nav_v10()
+            st.divider()
+            s_view_cols1_v10_final, s_view_cols2_v10_final = st.columns(2)
+            with s_view_cols1_v10_final:
+                if st.button("뒤로가기", use_container_width=True, key="s_view_go_back_vfinal_10"): 
+                    student_go_back_page_nav_v10() 
+            with s_view_cols2_v10_final:
+                if st.button("로그아웃", use_container_width=True, key="s_logout_view_vfinal_10"): 
+                    student_logout_nav_v10()
+    else: 
+        if st.session_state.student_page != "login": student_logout_nav_v10()
+
+    # --- 관리자 디버그 패널 (?debug=<ADMIN_DEBUG_TOKEN>) ---
+    admin_debug_token_v10 = read_secret_v10("ADMIN_DEBUG_TOKEN")
+    if admin_debug_token_v10 and hmac.compare_digest(str(st.query_params.get("debug", "")).encode("utf-8"), str(admin_debug_token_v10).encode("utf-8")): # 바이트로 비교 (문자열은 ASCII만 받음)
+        with st.expander("🛠️ 관리자 디버그 (실행 계측)"):
+            st.caption("최근 rerun 기록 (최신순)")
+            st.dataframe(pd.DataFrame([{"시각": r_dbg_v10["ts"], "페이지": r_dbg_v10["page"], "전체(초)": r_dbg_v10["total_seconds"],
+                                        **{f"{k_dbg_v10}(초)": v_dbg_v10 for k_dbg_v10, v_dbg_v10 in r_dbg_v10["phases"].items()},
+                                        "API 호출": len(r_dbg_v10["gspread_calls"]),
+                                        "캐시": ", ".join(f"{c_dbg_v10}={h_dbg_v10}" for c_dbg_v10, h_dbg_v10 in r_dbg_v10["cache"].items())}
+                                       for r_dbg_v10 in reversed(app_metrics_v10.recent_reruns)]), use_container_width=True)
+            st.caption("Sheets API 스케줄러")
+            if g_client_student_main_v10 is not None: st.json(g_client_student_main_v10.scheduler.metrics_snapshot())
+            st.caption("학생 일기 공유 캐시")
+            st.json({name_dbg_v10: samples_dbg_v10[0][1] for name_dbg_v10, _, _, samples_dbg_v10 in get_shared_diary_cache_v10().prometheus_samples()})
+            if class_prefetch_job_v10 is not None:
+                st.caption("반 전체 미리 불러오기")
+                st.json(class_prefetch_job_v10.progress_snapshot())
+                if st.button("지금 미리 불러오기", key="s_debug_prefetch_vfinal_10"):
+                    roster_df_debug_v10 = get_students_df_for_student_app_v10(g_client_student_main_v10)
+                    if roster_df_debug_v10.empty or not class_prefetch_job_v10.start(roster_df_debug_v10["시트URL"].tolist()):
+                        st.warning("학생목록이 없거나 이미 미리 불러오는 중입니다.")
+            st.code(app_metrics_v10.render_prometheus(), language="text")
@@ -0,0 +1,29 @@
+"""앱 스크립트의 정의(상수, 클래스, 함수)만 불러와서 단위 테스트한다.
+
+앱은 Streamlit 스크립트 하나라 import하면 화면 코드까지 실행되므로, 최상위의 import/상수/정의만 골라 실행한다.
+"""
+import ast
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "student_diary_app_FINAL_cleaned.py")
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+def _is_definition(node):
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    # 대문자 상수만 (세션 기본값, 메트릭 객체 생성 등 실행 코드는 제외)
+    return isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) and t.id.isupper() for t in node.targets)
+
+
+@pytest.fixture(scope="session")
+def app():
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), APP_PATH)
+    namespace = {"__file__": APP_PATH, "__name__": "student_diary_app"}
+    exec(compile(ast.Module([n for n in tree.body if _is_definition(n)], type_ignores=[]), APP_PATH, "exec"), namespace)
+    return namespace
@@ -0,0 +1,31 @@
+import gspread
+import pytest
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+from streamlit.testing.v1 import AppTest
+
+import bench_student_diary_app as bench
+from fake_gspread import FakeSheetsService
+
+
+@pytest.fixture
+def debug_app(monkeypatch):
+    # install_fake가 바꾸는 전역을 테스트가 끝나면 되돌린다
+    monkeypatch.setattr(gspread, "authorize", gspread.authorize)
+    monkeypatch.setattr(ServiceAccountCredentials, "from_json_keyfile_dict", ServiceAccountCredentials.from_json_keyfile_dict)
+    bench.install_fake(bench.build_fake_backend(1, 5, FakeSheetsService()))
+    workspace = bench.AppWorkspace()
+    at = AppTest.from_file(workspace.app_path, default_timeout=60)
+    at.secrets["GOOGLE_CREDENTIALS"] = {"type": "service_account", "fake": True}
+    at.secrets["ADMIN_DEBUG_TOKEN"] = "s3cret"
+    yield at
+    workspace.close()
+    st.cache_resource.clear()
+
+
+@pytest.mark.parametrize("value, shown", [("s3cret", True), ("wrong", False), ("디버그", False)])
+def test_debug_panel_needs_the_exact_token(debug_app, value, shown):
+    debug_app.query_params["debug"] = value
+    debug_app.run()
+    assert not debug_app.exception
+    assert any("관리자 디버그" in e.label for e in debug_app.expander) == shown
@@ -0,0 +1,23 @@
+import argparse
+
+import gspread
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+
+import bench_student_diary_app as bench
+
+
+def test_expired_cache_reads_only_the_revision_unless_the_sheet_changed(monkeypatch):
+    # install_fake가 바꾸는 전역을 테스트가 끝나면 되돌린다
+    monkeypatch.setattr(gspread, "authorize", gspread.authorize)
+    monkeypatch.setattr(ServiceAccountCredentials, "from_json_keyfile_dict", ServiceAccountCredentials.from_json_keyfile_dict)
+    args = argparse.Namespace(latency_ms=0.0, quota_reads_per_minute=None, quota_writes_per_minute=None, timeout=60.0)
+    try:
+        scenario = bench.scenario_change_detection(40, args)
+    finally:
+        st.cache_resource.clear()
+    calls = {p["page"]: p["calls_by_method"] for p in scenario["pages"]}
+    assert calls["view_diary_only"] == {}
+    assert calls["expired_first"] == {"get_lastUpdateTime": 1, "batch_get": 1}
+    assert calls["expired_unchanged"] == {"get_lastUpdateTime": 1}
+    assert calls["expired_teacher_note"] == {"get_lastUpdateTime": 1, "batch_get": 1}
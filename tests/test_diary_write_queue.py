@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+
+import gspread
+import pytest
+
+from fake_gspread import FakeSheetsService, FakeWorksheet, _FakeResponse
+
+HEADER = ["날짜", "감정", "감사한 일", "하고 싶은 말", "선생님 쪽지"]
+URL = "https://docs.google.com/spreadsheets/d/test"
+
+
+class FakePool:
+    """WorksheetHandlePool_v10 대역 - URL 하나에 가짜 워크시트 하나."""
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.structure_checked_urls = set()
+        self.invalidated = []
+
+    def get(self, sheet_url):
+        return self.worksheet
+
+    def invalidate(self, sheet_url):
+        self.invalidated.append(sheet_url)
+
+
+class FlakyWorksheet(FakeWorksheet):
+    """처음 몇 번의 저장(col_values)에서 지정한 오류를 내는 워크시트."""
+    def __init__(self, service, rows, errors):
+        super().__init__(service, rows)
+        self.errors = list(errors)
+        self.attempt_times = []
+
+    def col_values(self, col, **kwargs):
+        self.attempt_times.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().col_values(col, **kwargs)
+
+
+def quota_error():
+    return gspread.exceptions.APIError(_FakeResponse(429, "Quota exceeded (test)"))
+
+
+def sheet_rows(*diary_rows):
+    return [["설정", "2000-01-01"], list(HEADER)] + [list(r) for r in diary_rows]
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def read_journal(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def fast_queue(app, monkeypatch):
+    monkeypatch.setitem(app, "DIARY_WRITE_BATCH_WINDOW_SECONDS", 0.05)
+    monkeypatch.setitem(app, "DIARY_WRITE_RETRY_BASE_SECONDS", 0.2)
+    monkeypatch.setitem(app, "DIARY_WRITE_RETRY_MAX_SECONDS", 5)
+    monkeypatch.setattr(app["random"], "uniform", lambda a, b: 0.0) # 지터 없이 백오프 간격 확인
+    return app
+
+
+def make_queue(app, worksheet, tmp_path):
+    pool = FakePool(worksheet)
+    return app["DiaryWriteQueue_v10"](pool, str(tmp_path / "journal.jsonl")), pool
+
+
+def test_close_submissions_are_saved_in_one_batch(fast_queue, tmp_path):
+    service = FakeSheetsService()
+    ws = FakeWorksheet(service, sheet_rows(["2026-01-01", "😀 긍정 - 기쁨", "a", "b", ""]))
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    job1 = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g2", "m2"])
+    job2 = queue.submit(URL, "2026-01-03", ["2026-01-03", "😐 보통 - 그냥", "g3", "m3"])
+    assert wait_until(lambda: queue.status(job1)[0] == "done" and queue.status(job2)[0] == "done")
+    assert service.snapshot()["calls"] == {"get_all_values": 1, "col_values": 1, "append_rows": 1}
+    assert (queue.status(job1)[1], queue.status(job2)[1]) == (4, 5)
+    assert [r[0] for r in ws._values()[2:]] == ["2026-01-01", "2026-01-02", "2026-01-03"]
+
+
+def test_same_date_keeps_only_the_last_submission(fast_queue, tmp_path):
+    service = FakeSheetsService()
+    ws = FakeWorksheet(service, sheet_rows())
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    first = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "old", "old"])
+    second = queue.submit(URL, "2026-01-02", ["2026-01-02", "😢 부정 - 슬픔", "new", "new"])
+    assert wait_until(lambda: queue.status(second)[0] == "done")
+    assert queue.status(first) == ("done", 3, None)
+    assert ws._values()[2:] == [["2026-01-02", "😢 부정 - 슬픔", "new", "new", ""]]
+
+
+def test_retry_of_an_older_submission_does_not_overwrite_a_newer_one(fast_queue, tmp_path):
+    ws = FlakyWorksheet(FakeSheetsService(), sheet_rows(), [quota_error()])
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    first = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "OLD", "OLD"])
+    assert wait_until(lambda: len(ws.attempt_times) == 1) # 첫 제출은 429로 재시도 대기
+    second = queue.submit(URL, "2026-01-02", ["2026-01-02", "😢 부정 - 슬픔", "NEW", "NEW"])
+    assert wait_until(lambda: queue.status(second)[0] == "done")
+    time.sleep(0.5) # 첫 제출의 재시도 시각이 지나도
+    assert ws._values()[2:] == [["2026-01-02", "😢 부정 - 슬픔", "NEW", "NEW", ""]]
+    assert queue.status(first) == queue.status(second) == ("done", 3, None)
+    assert len(ws.attempt_times) == 2
+    assert queue.pending_count() == 0
+
+
+def test_due_flush_takes_every_pending_job_of_the_sheet(fast_queue, tmp_path, monkeypatch):
+    monkeypatch.setitem(fast_queue, "DIARY_WRITE_RETRY_BASE_SECONDS", 30)
+    ws = FlakyWorksheet(FakeSheetsService(), sheet_rows(), [quota_error()])
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    backing_off = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g2", "m2"])
+    assert wait_until(lambda: len(ws.attempt_times) == 1)
+    fresh = queue.submit(URL, "2026-01-03", ["2026-01-03", "😀 긍정 - 기쁨", "g3", "m3"])
+    assert wait_until(lambda: queue.status(fresh)[0] == "done")
+    assert queue.status(backing_off)[0] == "done" # 30초 백오프를 기다리지 않고 같은 묶음으로 저장
+    assert [r[0] for r in ws._values()[2:]] == ["2026-01-02", "2026-01-03"]
+
+
+def test_existing_date_is_updated_in_place(fast_queue, tmp_path):
+    service = FakeSheetsService()
+    ws = FakeWorksheet(service, sheet_rows(["2026-01-02", "😀 긍정 - 기쁨", "old", "old", "쪽지"]))
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    job = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "new", "new"])
+    assert wait_until(lambda: queue.status(job)[0] == "done")
+    assert queue.status(job)[1] == 3
+    assert "append_rows" not in service.snapshot()["calls"]
+    assert ws._values()[2] == ["2026-01-02", "😀 긍정 - 기쁨", "new", "new", "쪽지"] # 선생님 쪽지는 그대로
+
+
+def test_quota_errors_are_retried_with_exponential_backoff(fast_queue, tmp_path):
+    ws = FlakyWorksheet(FakeSheetsService(), sheet_rows(), [quota_error(), quota_error()])
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    job = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+    assert wait_until(lambda: queue.status(job)[0] == "done")
+    assert len(ws.attempt_times) == 3
+    first_gap, second_gap = (b - a for a, b in zip(ws.attempt_times, ws.attempt_times[1:]))
+    assert 0.2 <= first_gap < 0.4 # 기본 간격
+    assert 0.4 <= second_gap < 0.6 # 두 배
+    assert queue.pending_count() == 0
+
+
+def test_non_retryable_error_fails_at_once(fast_queue, tmp_path):
+    ws = FlakyWorksheet(FakeSheetsService(), sheet_rows(), [gspread.exceptions.SpreadsheetNotFound("gone")])
+    queue, pool = make_queue(fast_queue, ws, tmp_path)
+    job = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+    assert wait_until(lambda: queue.status(job)[0] == "failed")
+    assert len(ws.attempt_times) == 1
+    assert pool.invalidated == [URL]
+
+
+def test_gives_up_after_max_attempts(fast_queue, monkeypatch, tmp_path):
+    monkeypatch.setitem(fast_queue, "DIARY_WRITE_RETRY_BASE_SECONDS", 0.02)
+    monkeypatch.setitem(fast_queue, "DIARY_WRITE_MAX_ATTEMPTS", 3)
+    ws = FlakyWorksheet(FakeSheetsService(), sheet_rows(), [quota_error() for _ in range(10)])
+    queue, _ = make_queue(fast_queue, ws, tmp_path)
+    job = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+    assert wait_until(lambda: queue.status(job)[0] == "failed")
+    assert len(ws.attempt_times) == 3
+    assert "Quota exceeded" in queue.status(job)[2]
+
+
+def test_journal_is_replayed_on_startup(fast_queue, tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    job = {"id": "leftover", "url": URL, "date": "2026-01-02", "values": ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"]}
+    journal.write_text(json.dumps(job, ensure_ascii=False) + "\n", encoding="utf-8")
+    ws = FakeWorksheet(FakeSheetsService(), sheet_rows())
+    queue = fast_queue["DiaryWriteQueue_v10"](FakePool(ws), str(journal))
+    assert queue.status("leftover")[0] in ("pending", "done")
+    assert wait_until(lambda: queue.status("leftover")[0] == "done")
+    assert ws._values()[2][:4] == ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"]
+    assert wait_until(lambda: read_journal(journal) == []) # 저장이 끝나면 저널에서 정리
+
+
+def test_submitted_job_is_journaled_before_it_is_acknowledged(fast_queue, tmp_path):
+    release = threading.Event()
+
+    class BlockedPool(FakePool):
+        def get(self, sheet_url):
+            release.wait()
+            return self.worksheet
+
+    queue = fast_queue["DiaryWriteQueue_v10"](BlockedPool(FakeWorksheet(FakeSheetsService(), sheet_rows())), str(tmp_path / "journal.jsonl"))
+    try:
+        job = queue.submit(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+        assert [j["id"] for j in read_journal(tmp_path / "journal.jsonl")] == [job]
+    finally:
+        release.set()
+
+
+def test_submit_racing_a_journal_rewrite_is_not_lost(fast_queue, tmp_path):
+    release = threading.Event()
+
+    class BlockedPool(FakePool):
+        def get(self, sheet_url):
+            release.wait() # 저장을 막아 두어 모든 작업이 대기 중으로 남도록
+            return self.worksheet
+
+    journal = tmp_path / "journal.jsonl"
+    queue = fast_queue["DiaryWriteQueue_v10"](BlockedPool(FakeWorksheet(FakeSheetsService(), sheet_rows())), str(journal))
+    stop = threading.Event()
+
+    def keep_rewriting():
+        while not stop.is_set():
+            queue._rewrite_journal()
+
+    rewriters = [threading.Thread(target=keep_rewriting) for _ in range(2)]
+    for t in rewriters:
+        t.start()
+    try:
+        # 날짜가 모두 달라야 한다 (같은 날짜의 대기 중인 제출은 새 제출로 대체되어 저널에서 빠짐)
+        job_ids = [queue.submit(URL, f"2026-{k // 28 + 1:02d}-{k % 28 + 1:02d}", ["x"]) for k in range(300)]
+    finally:
+        stop.set()
+        for t in rewriters:
+            t.join()
+    try:
+        assert {j["id"] for j in read_journal(journal)} == set(job_ids)
+    finally:
+        release.set()
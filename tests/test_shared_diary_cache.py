@@ -0,0 +1,30 @@
+URL = "https://docs.google.com/spreadsheets/d/test"
+
+
+class EvictingBackend:
+    """변경 표식을 확인하는 사이 다른 세션 때문에 항목이 캐시에서 내보내진 상황을 만든다."""
+    def __init__(self, cache, revision):
+        self.cache = cache
+        self._revision = revision
+
+    def revision(self, sheet_url):
+        self.cache.invalidate(sheet_url)
+        return self._revision
+
+
+def make_store(app):
+    return app["StudentDiaryStore_v10"]([(3, "2026-01-02")], [(3, 3)], {3: ["2026-01-02", "😀 긍정 - 기쁨", "g", "m", ""]})
+
+
+def test_revalidate_returns_the_store_even_if_it_was_evicted_meanwhile(app):
+    cache = app["SharedDiaryCache_v10"](1024 * 1024, 0)
+    store = make_store(app)
+    cache.put(URL, store, "rev1")
+    outcome = app["revalidate_shared_diary_v10"](EvictingBackend(cache, "rev1"), cache, URL, "2026-01-01")
+    assert outcome == ("revalidated", store)
+    assert cache.peek(URL) is None
+
+
+def test_revalidate_without_a_cached_entry_asks_for_a_full_reload(app):
+    cache = app["SharedDiaryCache_v10"](1024 * 1024, 0)
+    assert app["revalidate_shared_diary_v10"](EvictingBackend(cache, "rev1"), cache, URL, "2026-01-01") is None
@@ -0,0 +1,27 @@
+class CountingSpreadsheet:
+    """gspread.Spreadsheet 대역 - sheet1을 읽을 때마다 (실제로는 메타데이터 요청) 센다."""
+    def __init__(self):
+        self.sheet1_requests = 0
+
+    @property
+    def sheet1(self):
+        self.sheet1_requests += 1
+        return object()
+
+
+class CountingClient:
+    def __init__(self):
+        self.spreadsheet = CountingSpreadsheet()
+
+    def open_by_url(self, url):
+        return self.spreadsheet
+
+
+def test_sheet1_metadata_request_goes_through_the_read_budget_once(app):
+    scheduler = app["SheetsApiScheduler_v10"](60, 60, 10)
+    raw_client = CountingClient()
+    spreadsheet = app["ScheduledSheetsClient_v10"](raw_client, scheduler).open_by_url("https://docs.google.com/spreadsheets/d/x")
+    first, second = spreadsheet.sheet1, spreadsheet.sheet1
+    assert first is second
+    assert raw_client.spreadsheet.sheet1_requests == 1
+    assert scheduler.metrics_snapshot()["read_calls"] == 2 # open_by_url + sheet1
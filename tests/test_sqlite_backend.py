@@ -0,0 +1,75 @@
+import pytest
+
+URL = "https://docs.google.com/spreadsheets/d/test"
+
+
+class FakeSheetsBackend:
+    """GoogleSheetsDiaryBackend_v10 대역 - 보낸 저장 작업과 그 상태를 직접 정한다."""
+    def __init__(self):
+        self.sent = [] # (작업 ID, 날짜, 값)
+        self.states = {}
+        self.client = None
+
+    def upsert_entry(self, sheet_url, date, row_values):
+        job_id = f"job{len(self.sent)}"
+        self.sent.append((job_id, date, list(row_values)))
+        self.states[job_id] = "pending"
+        return job_id
+
+    def write_status(self, job_id):
+        return (self.states.get(job_id), None, "boom" if self.states.get(job_id) == "failed" else None)
+
+
+@pytest.fixture
+def backend(app, tmp_path):
+    sheets = FakeSheetsBackend()
+    return app["SQLiteDiaryBackend_v10"](str(tmp_path / "diary.sqlite3"), sheets), sheets
+
+
+def dirty_rows(sqlite_backend):
+    return sqlite_backend._query("SELECT date, push_job FROM entries WHERE dirty != 0")
+
+
+def test_row_stays_dirty_until_the_sheet_write_is_done(backend):
+    local, sheets = backend
+    local.upsert_entry(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+    local._push_changes()
+    assert dirty_rows(local) == [("2026-01-02", "job0")]
+    local._push_changes() # 아직 저장 중이면 다시 보내지 않는다
+    assert len(sheets.sent) == 1
+    sheets.states["job0"] = "done"
+    local._push_changes()
+    assert dirty_rows(local) == []
+
+
+def test_failed_sheet_write_is_sent_again(backend):
+    local, sheets = backend
+    local.upsert_entry(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "g", "m"])
+    local._push_changes()
+    sheets.states["job0"] = "failed"
+    local._push_changes()
+    assert [job for job, _, _ in sheets.sent] == ["job0", "job1"]
+    assert dirty_rows(local) == [("2026-01-02", "job1")]
+
+
+def test_local_edit_after_push_is_sent_with_new_values(backend):
+    local, sheets = backend
+    local.upsert_entry(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "old", "old"])
+    local._push_changes()
+    local.upsert_entry(URL, "2026-01-02", ["2026-01-02", "😀 긍정 - 기쁨", "new", "new"])
+    sheets.states["job0"] = "done" # 앞선 저장이 끝나도 새 변경은 동기화된 것으로 보지 않는다
+    local._push_changes()
+    assert sheets.sent[-1][2][2] == "new"
+    assert dirty_rows(local) == [("2026-01-02", "job1")]
+
+
+def test_storage_backend_interface_is_abstract(app):
+    with pytest.raises(TypeError):
+        app["DiaryStorageBackend_v10"]()
+
+    class Incomplete(app["DiaryStorageBackend_v10"]):
+        def roster_available(self):
+            return True
+
+    with pytest.raises(TypeError):
+        Incomplete()
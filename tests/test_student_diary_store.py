@@ -0,0 +1,27 @@
+HEADER = ["날짜", "감정", "감사한 일", "하고 싶은 말", "선생님 쪽지"]
+
+
+def record(date, text):
+    return dict(zip(HEADER, [date, "😀 긍정 - 기쁨", text, text, ""]))
+
+
+def make_store(app):
+    # 3~6행: 2026-01-01 ~ 2026-01-04, 최근 두 행(5~6행)만 읽어 둔 상태
+    index = [(3 + k, f"2026-01-0{k + 1}") for k in range(4)]
+    return app["StudentDiaryStore_v10"](index, [(5, 6)], {5: record("2026-01-03", "c"), 6: record("2026-01-04", "d")})
+
+
+def test_add_rows_merges_rows_whose_dates_match_the_index(app):
+    store = make_store(app)
+    assert store.add_rows([(3, 4)], {3: record("2026-01-01", "a"), 4: record("2026-01-02", "b")}) is True
+    assert store.get("2026-01-01")["감사한 일"] == "a"
+    assert store.missing_row_spans("2026-01-01", "2026-01-04") == []
+
+
+def test_add_rows_rejects_rows_that_moved_since_the_index_was_read(app):
+    store = make_store(app)
+    # 선생님이 맨 위에 행을 끼워 넣어 3~4행이 한 칸씩 밀림
+    shifted = {3: record("2025-12-31", "inserted"), 4: record("2026-01-01", "a")}
+    assert store.add_rows([(3, 4)], shifted) is False
+    assert store.get("2026-01-01") is None # 엉뚱한 행을 붙이지 않는다
+    assert store.missing_row_spans("2026-01-01", "2026-01-02") == [(3, 4)]
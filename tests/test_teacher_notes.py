@@ -0,0 +1,10 @@
+def test_new_notes_are_those_after_the_last_checked_date(app):
+    dates = ["2026-01-01", "2026-01-03", "2026-01-02", "잘못된 날짜", "2026-01-04", " 2026-01-05 ", None]
+    notes = ["옛 쪽지", "셋째", " 둘째 ", "무시", "", "다섯째", "날짜 없음"]
+    assert app["new_notes_from_columns_v10"]("2026-01-01", dates, notes) == [
+        ("2026-01-02", "둘째"), ("2026-01-03", "셋째"), ("2026-01-05", "다섯째")]
+
+
+def test_missing_last_checked_date_falls_back_to_the_settings_default(app):
+    assert app["new_notes_from_columns_v10"](None, ["1999-12-31", "2000-01-02"], ["a", "b"]) == [("2000-01-02", "b")]
+    assert app["new_notes_from_columns_v10"]("2026-01-01", [], []) == []